@@ -1,90 +1,66 @@
-import eel
-from controllers import tokenizer, CoolParser, evaluate_reverse_parse, FormatVisitor, TypeChecker, TypeBuilder, TypeCollector, TypeInferer
-
-eel.init('public')
-
-def _tokenizer(code):
-    comment = "================== TOKENS ====================="
-
-    return (comment, tokenizer(code))
-
-def _parse(tokens, errors = []):
-    comment = '=================== PARSE ====================='
-
-    parse, operations = CoolParser(tokens)
-
-    if not operations:
-        errors.append(f'Parse Error: Unexpected token "{parse.lex}" in line "{parse.line}" and column "{parse.column}". Suggestion: check ";" in end of class and methods.')
-        return (comment, None, None)
-    
-    return (comment, parse, operations)
-
-def _getAST(parse, operations, tokens):
-    return evaluate_reverse_parse(parse, operations, tokens)
-
-def _collectingTypes(ast, errors = []):
-    comment = '============== COLLECTING TYPES ==============='
-
-    collector = TypeCollector(errors)
-    collector.visit(ast)
-    context = collector.context
-
-    return (comment, context)
-
-def _buildingTypes(context, ast, errors = []):
-    comment = "=============== BUILDING TYPES =================="
-    builder = TypeBuilder(context, errors)
-    builder.visit(ast)
-
-    return comment
-
-def _checkingTypes(context, ast, errors = []):
-    comment =  '============== CHECKING TYPES ===================='
-    checker = TypeChecker(context, errors)
-    scope = checker.visit(ast)
-
-    return (comment, scope)
-
-def _infererTypes(context, ast, scope, errors: list = [], inference: list = []):
-    comment = '============== INFERINING TYPES ==============='
-    inferer = TypeInferer(context, errors, inference)
-    while inferer.visit(ast, scope): pass
-
-    return comment
-    
-@eel.expose
-def handler(code: str):
-    errors: list = []
-    # print(code)
-
-    comment_tokenizer, tokens = _tokenizer(code)
-    comment_parser, parser, operations = _parse(tokens, errors)
-
-    if len(errors):
-        return {
-            'errors': 'Errors:\n' + '.\n'.join(e for e in errors),
-        }
-
-    ast = _getAST(parser, operations, tokens)
-
-    comment_collecting, context = _collectingTypes(ast, errors)
-    comment_building = _buildingTypes(context, ast, errors)
-    comment_checking, scope = _checkingTypes(context, ast, errors)
-
-    inference: list = []
-    
-    comment_inferer  = _infererTypes(context, ast, scope, errors, inference)
-
-    # 'context': 'Context:\n' + context.__str__(),
-    return {
-        'errors': 'Errors:\n' + '.\n'.join(e for e in errors),
-        'inference': 'Inference:\n' + '.\n'.join(i for i in inference)
-    }
-
-eel.start('index.html')
+import os
+import sys
+import argparse
+
+from controllers.pipeline import INFERERS
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python .', description='Chequeo e inferencia de tipos de programas Cool. Sin archivos abre la interfaz.')
+    parser.add_argument('paths', nargs='*', help='archivos .cl o carpetas a chequear sin la interfaz, el resultado sale como una linea JSON por archivo')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='procesos para chequear los archivos (por defecto uno por cpu)')
+    parser.add_argument('-o', '--output', default=None, help='archivo donde escribir el resultado (por defecto stdout)')
+    parser.add_argument('--serve', action='store_true', help='queda escuchando pedidos JSON-RPC de chequeo (ver controllers/server.py)')
+    parser.add_argument('--host', default='127.0.0.1', help='direccion del servidor (por defecto 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='puerto del servidor (por defecto 8765)')
+    parser.add_argument('--socket', default=None, help='socket Unix donde escuchar en vez de TCP')
+    parser.add_argument('--cache', default=None, help='carpeta donde guardar los resultados para los proximos analisis')
+    parser.add_argument('--cache-size', type=float, default=None, help='megabytes que puede ocupar la carpeta del cache (por defecto 64)')
+    parser.add_argument('--inferer', choices=INFERERS, default='fixpoint', help='motor de inferencia de tipos (por defecto fixpoint)')
+    parser.add_argument('--workers', type=int, default=None, help='procesos entre los que se reparten las clases en el chequeo de tipos de cada programa (por lotes con -j 1 y en el servidor)')
+    args = parser.parse_args(argv)
+
+    # el cache en disco se configura por el entorno para que lo vean los procesos de los pools
+    if args.cache is not None:
+        os.environ['COOL_CACHE'] = args.cache
+    if args.cache_size is not None:
+        os.environ['COOL_CACHE_SIZE'] = str(args.cache_size)
+
+    if args.serve:
+        from controllers.server import run
+        return run(args.host, args.port, args.socket, args.jobs, args.inferer, args.workers)
+
+    if args.paths:
+        from controllers.batch import run
+        return 1 if run(args.paths, args.jobs, args.output, args.inferer, args.workers) else 0
+
+    # eel solo hace falta para la interfaz
+    import eel
+    import gevent
+    from controllers import pipeline, LiveChecker
+
+    eel.init('public')
+
+    @eel.expose
+    def handler(code):
+        return pipeline.handler(code, args.inferer)
+
+    # cada analisis es una tarea de gevent (como las de eel) que corre sus fases en el pool de hilos
+    # de gevent, asi el loop sigue atendiendo la pagina; las fases se mandan con eel.phase (main.js)
+    hub = gevent.get_hub()
+    live = LiveChecker(lambda *args: eel.phase(*args), gevent.spawn, lambda function, *args: hub.threadpool.apply(function, args), inferer=args.inferer)
+
+    @eel.expose
+    def submit(client, code):
+        return live.submit(client, code)
+
+    eel.start('index.html')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
 
 # if __name__ == '__main__':
 #     from pathlib import Path
-    
-#     code = (Path.cwd() / 'test' / '2.cl').read_text()
-#     handler(code)
+#     from controllers import handler_file
+
+#     handler_file(Path.cwd() / 'test' / '2.cl')
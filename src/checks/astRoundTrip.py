@@ -0,0 +1,91 @@
+import sys
+import time
+import marshal
+from pathlib import Path
+
+from controllers import astFormat
+from controllers.astclass import Node, _fields
+from controllers.cmp import Token
+from controllers.pipeline import _tokenizer, _parse
+
+# Chequeo del formato de astFormat: cada programa de test/ (o los .cl que se pasen) se parsea, se
+# guarda y se carga, y el AST cargado tiene que ser igual nodo a nodo al parseado. Tambien compara
+# el tiempo de loads con el de lexear y parsear, y que los datos de otra version o cortados den
+# ValueError. Se corre desde src con `python -m checks.astRoundTrip [archivos]`.
+
+TEST = Path(__file__).resolve().parents[2] / 'test'
+
+# primera diferencia entre `a` y `b` como texto, None si son iguales
+def difference(a, b, path='ast'):
+    if type(a) is not type(b):
+        return f'{path}: {type(a).__name__} != {type(b).__name__}'
+    if isinstance(a, Node):
+        if (a.line, a.column) != (b.line, b.column):
+            return f'{path}: position {(a.line, a.column)} != {(b.line, b.column)}'
+        for name in _fields(type(a)):
+            found = difference(getattr(a, name, None), getattr(b, name, None), f'{path}.{name}')
+            if found:
+                return found
+    elif isinstance(a, Token):
+        if (a.lex, a.token_type, a.line, a.column) != (b.lex, b.token_type, b.line, b.column):
+            return f'{path}: token {a.lex!r} {a.token_type} {a.line}:{a.column} != {b.lex!r} {b.token_type} {b.line}:{b.column}'
+    elif isinstance(a, (list, tuple)):
+        if len(a) != len(b):
+            return f'{path}: length {len(a)} != {len(b)}'
+        for k, (x, y) in enumerate(zip(a, b)):
+            found = difference(x, y, f'{path}[{k}]')
+            if found:
+                return found
+    elif a is not None:
+        return f'{path}: unexpected {type(a).__name__}'
+    return None
+
+def rejects(data):
+    try:
+        astFormat.loads(data)
+    except ValueError:
+        return True
+    return False
+
+def main(paths):
+    files = [Path(path) for path in paths] or sorted(TEST.glob('*.cl'))
+    parsing = loading = 0.0
+    size = source = checked = 0
+    blob = None
+
+    for path in files:
+        code = path.read_text()
+        start = time.perf_counter()
+        errors = []
+        _, ast = _parse(_tokenizer(code)[1], errors)
+        parsing += time.perf_counter() - start
+        if ast is None:
+            print(f'{path}: parse error, skipped')
+            continue
+
+        blob = astFormat.dumps(ast)
+        start = time.perf_counter()
+        loaded = astFormat.loads(blob)
+        loading += time.perf_counter() - start
+
+        found = difference(ast, loaded)
+        assert found is None, f'{path}: {found}'
+        size += len(blob)
+        source += len(code)
+        checked += 1
+
+    assert checked, 'no program could be parsed'
+
+    # etiqueta de otra gramatica o formato, cuerpo cortado y datos que no son del formato
+    stamp, body = marshal.loads(blob)
+    assert rejects(marshal.dumps(('0' * len(stamp), body)))
+    assert rejects(marshal.dumps((stamp, body[:len(body) // 2])))
+    assert rejects(blob[:len(blob) // 2])
+    assert rejects(b'')
+
+    print(f'ok: {checked} round trips, {size} bytes for {source} bytes of source')
+    print(f'tokenize+parse {parsing * 1000:.1f} ms, loads {loading * 1000:.1f} ms ({parsing / loading:.1f}x)')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,34 @@
+import sys
+import time
+
+from controllers import analyze
+
+# Chequeo de los recorridos sin recursion: programas con expresiones anidadas `depth` niveles
+# (50000 por defecto) y un bloque de `depth` expresiones se analizan completos con el limite de
+# recursion por defecto de Python. Se corre desde src con `python -m checks.deepExpressions [depth]`.
+
+def programs(depth):
+    yield 'plus', 'Int', ' + '.join(['1'] * depth)
+    yield 'parens', 'Int', '(' * depth + '1' + ')' * depth
+    yield 'let', 'Int', 'let x: Int <- 1 in ' * depth + 'x'
+    yield 'not', 'Bool', 'not ' * depth + 'true'
+    yield 'if', 'Int', 'if true then ' * depth + '1' + ' else 0 fi' * depth
+    yield 'block', 'Int', '{ ' + '1; ' * depth + '}'
+
+def main(argv):
+    depth = int(argv[0]) if argv else 50000
+    assert sys.getrecursionlimit() <= 1000, 'run it with the default recursion limit'
+
+    for name, typex, expression in programs(depth):
+        code = f'class Main {{ main(): {typex} {{ {expression} }}; }};'
+        start = time.perf_counter()
+        errors, inference = analyze(code)
+        elapsed = time.perf_counter() - start
+        assert inference is not None and not errors, f'{name}: {errors[:3]}'
+        print(f'{name:6} depth {depth}: {elapsed:.2f}s')
+
+    print('ok')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
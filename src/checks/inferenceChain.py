@@ -0,0 +1,55 @@
+import sys
+import time
+
+from controllers import TypeInferer
+from controllers.pipeline import _tokenizer, _parse, _collectingTypes, _buildingTypes, _checkingTypes
+
+# Benchmark de la inferencia con cadenas de metodos AUTO_TYPE: cada metodo de la cadena llama al
+# siguiente y solo el ultimo tiene un tipo conocido, asi cada pasada infiere un metodo mas. Se
+# compara TypeInferer, que solo vuelve a visitar las unidades que dependen de lo que cambio, con
+# el recorrido completo en cada pasada; los mensajes, errores y pasadas tienen que ser iguales.
+# Se corre desde src con `python -m checks.inferenceChain [largo de la cadena]`.
+
+# recorrido completo: todas las unidades se visitan en todas las pasadas
+class FullInferer(TypeInferer):
+    def pending(self, unit):
+        return True
+
+def chain(length):
+    methods = [f'f{i}(x: AUTO_TYPE): AUTO_TYPE {{ f{i + 1}(x) }};' for i in range(length)]
+    methods.append(f'f{length}(x: AUTO_TYPE): AUTO_TYPE {{ x + 1 }};')
+    # metodos que no dependen de la cadena, el recorrido completo los vuelve a visitar en cada pasada
+    methods.extend(f'g{i}(y: AUTO_TYPE): Int {{ y + {i} }};' for i in range(length))
+    attributes = 'a: AUTO_TYPE <- f0(1); b: AUTO_TYPE <- a;'
+    return f'class Main {{ {attributes} {" ".join(methods)} main(): Object {{ f0(a) }}; }};'
+
+def infer(code, engine):
+    errors = []
+    _, ast = _parse(_tokenizer(code)[1], errors)
+    _, context = _collectingTypes(ast, errors)
+    _buildingTypes(context, ast, errors)
+    _, scope = _checkingTypes(context, ast, errors)
+
+    inference = []
+    inferer = engine(context, errors, inference)
+    start = time.perf_counter()
+    passes = 1
+    while inferer.visit(ast, scope):
+        passes += 1
+    return time.perf_counter() - start, passes, errors, inference
+
+def main(argv):
+    length = int(argv[0]) if argv else 300
+    code = chain(length)
+
+    worklist = infer(code, TypeInferer)
+    full = infer(code, FullInferer)
+    assert worklist[1:] == full[1:], 'the worklist inferer changed the passes, errors or inference messages'
+    assert worklist[1] > length, f'expected a pass per method of the chain, got {worklist[1]}'
+
+    print(f'chain of {length} methods, {worklist[1]} passes, {len(worklist[3])} inference messages (identical)')
+    print(f'full traversal {full[0]:.2f}s, worklist {worklist[0]:.2f}s ({full[0] / worklist[0]:.1f}x)')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,54 @@
+import sys
+import time
+import threading
+from pathlib import Path
+
+from controllers import LiveChecker, analyze
+from controllers.pipeline import _payload, cache
+
+# Chequeo de LiveChecker con muchos clientes (cada recarga de la pagina es uno nuevo): la cantidad
+# de sesiones guardadas no pasa de `size` y un cliente olvidado que vuelve a mandar se atiende
+# como uno nuevo. Se corre desde src con `python -m checks.liveClients`.
+
+SIZE = 4
+
+def main():
+    code = (Path(__file__).resolve().parents[2] / 'test' / '2.cl').read_text()
+    expected = _payload(*analyze(code))
+
+    finals = {}
+    def send(client, generation, phase, result):
+        if phase == 'inference':
+            finals[client] = result
+
+    # analisis en el mismo hilo: cada submit termina antes de retornar
+    live = LiveChecker(send, spawn=lambda function, *args: function(*args), size=SIZE)
+    for k in range(200):
+        cache.clear()
+        live.submit(f'page{k}', code + '\n' * (k % 7))
+        assert len(live.clients) <= SIZE, len(live.clients)
+    assert list(live.clients) == [f'page{k}' for k in range(200 - SIZE, 200)]
+    assert all(finals[f'page{k}'] == expected for k in range(200))
+
+    # los clientes con un analisis corriendo no se olvidan hasta que terminan
+    release = threading.Event()
+    def blocked(function, *args):
+        release.wait()
+        return function(*args)
+
+    live = LiveChecker(send, run=blocked, size=SIZE)
+    for k in range(SIZE + 3):
+        cache.clear()
+        live.submit(f'busy{k}', code)
+    assert len(live.clients) == SIZE + 3
+    release.set()
+    while any(state.running for state in list(live.clients.values())):
+        time.sleep(0.01)
+    live.submit('after', code)
+    assert len(live.clients) <= SIZE, len(live.clients)
+
+    print(f'ok: 200 clients kept at most {SIZE} sessions, running clients are kept until they finish')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
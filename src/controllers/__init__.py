@@ -4,7 +4,14 @@ from .astclass import *
 from .formatVisitor import FormatVisitor
 from .typeBuilder import TypeBuilder
 from .typeChecker import TypeChecker
+from .parallelChecker import ParallelTypeChecker
 from .typeCollector import TypeCollector
 from .typeInfer import TypeInferer
+from .constraintInfer import ConstraintInferer
 from .cmp import evaluate_reverse_parse
-from .messages import *
\ No newline at end of file
+from .messages import *
+from .checkSession import CheckSession
+from .pipeline import analyze, handler, handler_file
+from .liveChecker import LiveChecker
+from . import astFormat
+from .resultCache import ResultCache, ASTCache
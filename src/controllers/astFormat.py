@@ -0,0 +1,146 @@
+import os
+import zlib
+import marshal
+import hashlib
+from array import array
+
+from . import astclass
+from .astclass import Node, _fields
+from .cmp import Token
+from .parser import CoolGrammar, CoolParser
+
+# Formato binario del AST que sale del parser, para guardarlo y cargarlo sin volver a lexear ni
+# parsear. Es una tupla de marshal con la etiqueta del formato, que cambia con la gramatica (su
+# fingerprint), con las clases de nodos o con el codigo del lexer, del parser y de lo que usan de
+# cmp (las acciones de las producciones no cambian el fingerprint), y el resto comprimido con zlib
+# (queda unas 3 veces mas chico, cerca del tamaño del codigo fuente):
+#   - la tabla de tokens por columnas: tipos, lexemas, lineas y columnas
+#   - el arbol como un programa de pila en postorden (enteros): un entero >= 0 apila ese token,
+#     _NONE apila None, _LIST/_TUPLE n juntan los n ultimos en una lista/tupla y _NODE - k linea
+#     columna crea un nodo de la clase k con los ultimos valores como sus campos (ver _fields)
+# static_type no se guarda: se guarda el AST recien parseado, antes de los chequeos.
+
+FORMAT = 1
+
+_NONE = -1
+_LIST = -2
+_TUPLE = -3
+_NODE = -4
+
+# clases de nodos en el orden en que estan definidas, el numero de cada una va en el programa
+_CLASSES = [cls for cls in vars(astclass).values() if isinstance(cls, type) and issubclass(cls, Node)]
+_INDEX = {cls: k for k, cls in enumerate(_CLASSES)}
+
+# codigo que decide el AST: el lexer, el parser y sus nodos, y de cmp el automata del parser
+# (grammar), la gramatica (pycompiler) y los tokens (utils)
+_SOURCES = ('lexer.py', 'parser.py', 'astclass.py',
+            os.path.join('cmp', 'grammar.py'), os.path.join('cmp', 'utils.py'), os.path.join('cmp', 'pycompiler.py'))
+
+_tag = None
+
+def tag():
+    global _tag
+    if _tag is None:
+        layout = ';'.join(f'{cls.__name__}:{",".join(_fields(cls))}' for cls in _CLASSES)
+        digest = hashlib.sha256(f'{FORMAT}\0{CoolParser.fingerprint}\0{layout}'.encode('utf-8'))
+        for name in _SOURCES:
+            with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), name), 'rb') as file:
+                digest.update(file.read())
+        _tag = digest.hexdigest()
+    return _tag
+
+
+def dumps(ast):
+    tokens, lexemes, lines, columns, kinds, names = {}, [], array('i'), array('i'), array('H'), {}
+    code = array('i')
+
+    # preorden con los hijos al reves, dado vuelta al final queda el postorden
+    stack = [ast]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, Node):
+            cls = item.__class__
+            code.extend((item.column, item.line, _NODE - _INDEX[cls]))
+            stack.extend([getattr(item, name, None) for name in _fields(cls)])
+        elif isinstance(item, Token):
+            index = tokens.get(id(item))
+            if index is None:
+                index = tokens[id(item)] = len(lexemes)
+                lexemes.append(item.lex)
+                lines.append(item.line)
+                columns.append(item.column)
+                kinds.append(names.setdefault(item.token_type.Name, len(names)))
+            code.append(index)
+        elif item is None:
+            code.append(_NONE)
+        elif isinstance(item, list):
+            code.extend((len(item), _LIST))
+            stack.extend(item)
+        elif isinstance(item, tuple):
+            code.extend((len(item), _TUPLE))
+            stack.extend(item)
+        else:
+            raise TypeError(f'cannot serialize {type(item).__name__} in the AST')
+    code.reverse()
+
+    body = marshal.dumps((list(names), lexemes, kinds.tobytes(), lines.tobytes(), columns.tobytes(), code.tobytes()))
+    return marshal.dumps((tag(), zlib.compress(body)))
+
+# el AST guardado por dumps, ValueError si los datos no son de este formato o de esta gramatica
+def loads(data):
+    try:
+        stamp, body = marshal.loads(data)
+    except (EOFError, ValueError, TypeError) as ex:
+        raise ValueError(f'invalid AST data: {ex}')
+    if stamp != tag():
+        raise ValueError('the AST data was written for another grammar or format')
+
+    try:
+        names, lexemes, kinds, lines, columns, program = marshal.loads(zlib.decompress(body))
+    except (EOFError, ValueError, TypeError, zlib.error) as ex:
+        raise ValueError(f'invalid AST data: {ex}')
+
+    symbols = [CoolGrammar[name] for name in names]
+    kinds, lines, columns, code = array('H', kinds), array('i', lines), array('i', columns), array('i', program)
+    tokens = [Token(lex, symbols[kind], line, column) for lex, kind, line, column in zip(lexemes, kinds, lines, columns)]
+
+    try:
+        return _run(code, tokens)
+    except (IndexError, ValueError) as ex:
+        raise ValueError(f'invalid AST data: {ex}')
+
+def _run(code, tokens):
+    stack = []
+    push = stack.append
+    i, n = 0, len(code)
+    while i < n:
+        op = code[i]
+        i += 1
+        if op >= 0:
+            push(tokens[op])
+        elif op == _NONE:
+            push(None)
+        elif op == _LIST or op == _TUPLE:
+            start = len(stack) - code[i]
+            i += 1
+            items = stack[start:]
+            del stack[start:]
+            push(items if op == _LIST else tuple(items))
+        else:
+            cls, setters = _LAYOUTS[_NODE - op]
+            node = cls.__new__(cls)
+            node.line = code[i]
+            node.column = code[i + 1]
+            i += 2
+            start = len(stack) - len(setters)
+            for setter, value in zip(setters, stack[start:]):
+                setter(node, value)
+            del stack[start:]
+            push(node)
+
+    if len(stack) != 1 or not isinstance(stack[0], Node):
+        raise ValueError('invalid AST data')
+    return stack[0]
+
+# clase de cada numero y los descriptores de sus campos
+_LAYOUTS = [(cls, [getattr(cls, name).__set__ for name in _fields(cls)]) for cls in _CLASSES]
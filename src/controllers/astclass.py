@@ -1,8 +1,11 @@
+# los nodos usan __slots__ para no cargar un __dict__ por instancia, static_type lo asignan los chequeos de tipos
 class Node:
-    pass
+    __slots__ = ('line', 'column', 'static_type')
 
 
 class ProgramNode(Node):
+    __slots__ = ('declarations',)
+
     def __init__(self, declarations):
         self.declarations = declarations
         self.line = declarations[0].line
@@ -10,11 +13,13 @@ class ProgramNode(Node):
 
 
 class DeclarationNode(Node):
-    pass
+    __slots__ = ()
 
 
 #Declarations
 class ClassDeclarationNode(DeclarationNode):
+    __slots__ = ('id', 'parent', 'features')
+
     def __init__(self, idx, features, parent=None):
         self.id = idx
         self.parent = parent
@@ -24,6 +29,8 @@ class ClassDeclarationNode(DeclarationNode):
 
 
 class FuncDeclarationNode(DeclarationNode):
+    __slots__ = ('id', 'params', 'type', 'body')
+
     def __init__(self, idx, params, return_type, body):
         self.id = idx
         self.params = params
@@ -34,6 +41,8 @@ class FuncDeclarationNode(DeclarationNode):
 
 
 class AttrDeclarationNode(DeclarationNode):
+    __slots__ = ('id', 'type', 'expression')
+
     def __init__(self, idx, typex, expression = None):
         self.id = idx
         self.type = typex
@@ -43,10 +52,12 @@ class AttrDeclarationNode(DeclarationNode):
 
 
 class ExpressionNode(Node):
-    pass
+    __slots__ = ()
 
 #Expressions
 class IfThenElseNode(ExpressionNode):
+    __slots__ = ('condition', 'if_body', 'else_body')
+
     def __init__(self, condition, if_body, else_body):
         self.condition = condition
         self.if_body = if_body
@@ -55,6 +66,8 @@ class IfThenElseNode(ExpressionNode):
         self.column = condition.column
 
 class BlockNode(ExpressionNode):
+    __slots__ = ('expressions',)
+
     def __init__(self, expressions):
         self.expressions = expressions
         self.line = expressions[-1].line
@@ -62,6 +75,8 @@ class BlockNode(ExpressionNode):
 
 
 class WhileLoopNode(ExpressionNode):
+    __slots__ = ('condition', 'body')
+
     def __init__(self, condition, body):
         self.condition = condition
         self.body = body
@@ -70,6 +85,8 @@ class WhileLoopNode(ExpressionNode):
 
 
 class LetInNode(ExpressionNode):
+    __slots__ = ('let_body', 'in_body')
+
     def __init__(self, let_body, in_body):
         self.let_body = let_body
         self.in_body = in_body
@@ -78,6 +95,8 @@ class LetInNode(ExpressionNode):
 
 
 class CaseOfNode(ExpressionNode):
+    __slots__ = ('expression', 'branches')
+
     def __init__(self, expression, branches):
         self.expression = expression
         self.branches = branches
@@ -86,6 +105,8 @@ class CaseOfNode(ExpressionNode):
 
 
 class AssignNode(ExpressionNode):
+    __slots__ = ('id', 'expression')
+
     def __init__(self, idx, expression):
         self.id = idx
         self.expression = expression
@@ -94,15 +115,19 @@ class AssignNode(ExpressionNode):
 
 
 class UnaryNode(ExpressionNode):
+    __slots__ = ('expression',)
+
     def __init__(self, expression):
         self.expression = expression
         self.line = expression.line
         self.column = expression.column
 
 class NotNode(UnaryNode):
-    pass
+    __slots__ = ()
 
 class BinaryNode(ExpressionNode):
+    __slots__ = ('left', 'right')
+
     def __init__(self, left, right):
         self.left = left
         self.right = right
@@ -111,6 +136,8 @@ class BinaryNode(ExpressionNode):
 
 
 class FunctionCallNode(ExpressionNode):
+    __slots__ = ('obj', 'id', 'args', 'type')
+
     def __init__(self, obj, idx, args, typex=None):
         self.obj = obj
         self.id = idx
@@ -121,6 +148,8 @@ class FunctionCallNode(ExpressionNode):
 
 
 class MemberCallNode(ExpressionNode):
+    __slots__ = ('id', 'args')
+
     def __init__(self, idx, args):
         self.id = idx
         self.args = args
@@ -129,6 +158,8 @@ class MemberCallNode(ExpressionNode):
 
 
 class NewNode(ExpressionNode):
+    __slots__ = ('type',)
+
     def __init__(self, typex):
         self.type = typex
         self.line = typex.line
@@ -137,62 +168,86 @@ class NewNode(ExpressionNode):
 
 # check this
 class AtomicNode(ExpressionNode):
+    __slots__ = ('token',)
+
     def __init__(self, token):
         self.token = token
         self.line = token.line
         self.column = token.column
 
 class ArithmeticNode(BinaryNode):
-    pass
+    __slots__ = ()
 
 
 class LessEqualNode(BinaryNode):
-    pass
+    __slots__ = ()
 
 
 class LessNode(BinaryNode):
-    pass
+    __slots__ = ()
 
 
 class EqualNode(BinaryNode):
-    pass
+    __slots__ = ()
 
 
 class PlusNode(ArithmeticNode):
-    pass
+    __slots__ = ()
 
 
 class MinusNode(ArithmeticNode):
-    pass
+    __slots__ = ()
 
 
 class StarNode(ArithmeticNode):
-    pass
+    __slots__ = ()
 
 
 class DivNode(ArithmeticNode):
-    pass
+    __slots__ = ()
 
 
 class IsVoidNode(UnaryNode):
-    pass
+    __slots__ = ()
 
 
 class ComplementNode(UnaryNode):
-    pass
+    __slots__ = ()
 
 
 class IntegerNode(AtomicNode):
-    pass
+    __slots__ = ()
 
 
 class IdNode(AtomicNode):
-    pass
+    __slots__ = ()
 
 
 class StringNode(AtomicNode):
-    pass
+    __slots__ = ()
 
 
 class BoolNode(AtomicNode):
-    pass
+    __slots__ = ()
+
+
+# campos de cada clase de nodo en el orden de sus __slots__ (los de las bases primero), sin line/column/static_type
+_FIELDS = {}
+
+def _fields(cls):
+    fields = _FIELDS.get(cls)
+    if fields is None:
+        fields = _FIELDS[cls] = tuple(name for klass in reversed(cls.__mro__) if klass is not Node and issubclass(klass, Node) for name in klass.__dict__.get('__slots__', ()))
+    return fields
+
+# recorre en preorden todos los nodos que cuelgan de `node`, tambien los que estan dentro
+# de listas y tuplas (let_body, branches, args), con una pila en vez de recursion
+def iter_nodes(node):
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, Node):
+            yield item
+            stack.extend([getattr(item, name, None) for name in reversed(_fields(item.__class__))])
+        elif isinstance(item, (list, tuple)):
+            stack.extend(reversed(item))
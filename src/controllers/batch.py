@@ -0,0 +1,80 @@
+import os
+import sys
+import json
+import time
+from functools import partial
+from contextlib import redirect_stdout
+from multiprocessing import Pool
+
+from .pipeline import handler_file
+
+# Chequeo de muchos archivos sin la interfaz: cada archivo pasa por el pipeline completo (como
+# handler_file) en un pool de procesos y el resultado se escribe como una linea JSON por archivo,
+# en el mismo orden de la entrada. El parser se construye al importar controllers, asi que cada
+# proceso lo tiene listo desde que arranca (heredado con fork o cargado una vez con spawn).
+
+# los .cl de las carpetas (recursivamente y en orden) y los archivos tal como se dieron
+def collect(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                files.extend(os.path.join(root, name) for name in sorted(names) if name.endswith('.cl'))
+        else:
+            files.append(path)
+    return files
+
+def check_file(path, inferer='fixpoint', workers=None):
+    try:
+        result = handler_file(path, inferer, workers)
+    except Exception as ex:
+        result = {'exception': f'{type(ex).__name__}: {ex}'}
+    return {'file': path, **result}
+
+# el lexer imprime los caracteres ilegales, en los procesos del pool eso va a stderr para no mezclarse con el JSON
+def _start_worker():
+    sys.stdout = sys.stderr
+
+def _check_here(path, inferer, workers):
+    with redirect_stdout(sys.stderr):
+        return check_file(path, inferer, workers)
+
+# chequea `paths` con `jobs` procesos (None: uno por cpu, 1: en este proceso) y el motor de
+# inferencia `inferer` (una llave de INFERERS) y escribe los resultados en `output` (None: stdout).
+# Con `workers` el chequeo de tipos de cada archivo se reparte entre esa cantidad de procesos,
+# solo con jobs 1: los procesos del pool no pueden tener hijos y chequean en orden.
+# Retorna la cantidad de archivos que no se pudieron analizar (excepciones o archivos que no existen)
+def run(paths, jobs=None, output=None, inferer='fixpoint', workers=None):
+    files = collect(paths)
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = max(1, min(jobs, len(files)))
+
+    out = sys.stdout if output is None else open(output, 'w', encoding='utf-8')
+    counts = {'failed': 0, 'errors': 0}
+
+    def write(results):
+        for result in results:
+            if 'exception' in result:
+                counts['failed'] += 1
+            elif result['errors'] != 'Errors:\n':
+                counts['errors'] += 1
+            out.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+    start = time.perf_counter()
+    try:
+        if jobs == 1:
+            write(_check_here(path, inferer, workers) for path in files)
+        else:
+            with Pool(jobs, initializer=_start_worker) as pool:
+                write(pool.imap(partial(check_file, inferer=inferer, workers=workers), files, chunksize=max(1, len(files) // (jobs * 4))))
+    finally:
+        if output is not None:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    rate = len(files) / elapsed if elapsed > 0 else 0.0
+    print(f'{len(files)} files in {elapsed:.2f}s ({rate:.1f} files/s, {jobs} jobs): '
+          f'{counts["errors"]} with errors, {counts["failed"]} failed', file=sys.stderr)
+    return counts['failed']
@@ -0,0 +1,590 @@
+import re
+
+from .cmp import Scope, Method, Token
+from .lexer import iter_tokens, iter_positions
+from .parser import CoolParser, CoolGrammar, ProgramNode, AttrDeclarationNode, FuncDeclarationNode, LetInNode, FunctionCallNode, MemberCallNode
+from .astclass import iter_nodes
+from .typeCollector import TypeCollector
+from .typeBuilder import TypeBuilder
+from .typeChecker import TypeChecker
+from .typeInfer import TypeInferer, signature
+from .messages import ERROR, INFERENCE, PARSE_ERROR
+
+# Sesion de chequeo incremental: guarda el AST, el contexto y el scope del ultimo analisis y
+# en el siguiente solo rehace lo que pudo cambiar. El resultado es el mismo que el de analyze.
+#
+# - El programa se parte en los tokens de cada clase (desde su `class` hasta el siguiente). Solo
+#   se lexea desde la primera clase que pudo cambiar hasta que el lexer llega al `class` de una
+#   clase del final del texto que no cambio: como el lexer no mira hacia atras, desde ahi los
+#   tokens son los mismos de antes.
+# - Una clase con los mismos tokens que antes (con lineas relativas a su `class`) conserva su AST,
+#   si se movio de linea solo se corren las lineas de tokens y nodos.
+# - El contexto se conserva mientras no cambien los nombres y padres de las clases. Si cambian
+#   las firmas de atributos o metodos de una clase, sus miembros (y los de sus descendientes) se
+#   vuelven a construir en el mismo contexto. Si cambian los nombres o padres, TypeBuilder da
+#   errores, o hay herencia ciclica o clases repetidas, se analiza todo de nuevo.
+# - Se vuelven a chequear e inferir las clases que cambiaron o cuyo metodo anterior cambio (el
+#   chequeo lo arrastra de una clase a la siguiente), y tambien las que estan ligadas a ellas
+#   por la inferencia: las que leen un metodo o atributo de ellas que la inferencia cambia, y
+#   aquellas cuyos miembros cambiantes leen. Las demas reusan sus errores y mensajes.
+# - Los mensajes de inferencia se guardan con la pasada y la unidad (atributo, metodo o cierre
+#   de la clase) que los emitio; ordenados asi quedan como en el recorrido completo.
+
+CLASS = CoolGrammar['class']
+OPEN = CoolGrammar['(']
+MINUS = CoolGrammar['-']
+
+# lineas de los mensajes con posicion, para correrlos cuando su clase cambia de linea
+_POSITIONS = [re.compile('^(%s)(\\d+)(%s)' % (re.escape(before), re.escape(after))) for before, after, _ in (fmt.split('%d') for fmt in (ERROR, INFERENCE))]
+
+# largo del prefijo (o del sufijo) comun de `a` y `b`, comparando pedazos en vez de caracteres
+def _common(a, b, suffix=False):
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if suffix:
+            same = a[len(a) - mid:len(a) - lo] == b[len(b) - mid:len(b) - lo]
+        else:
+            same = a[lo:mid] == b[lo:mid]
+        if same:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+def _move(message, delta):
+    if delta:
+        for pattern in _POSITIONS:
+            match = pattern.match(message)
+            if match:
+                return match.group(1) + str(int(match.group(2)) + delta) + message[match.end(2):]
+    return message
+
+
+# tokens de una declaracion de clase y su AST
+class _Segment:
+    def __init__(self, tokens, start=0, end=0, reach=0):
+        self.tokens = tokens
+        self.start = start      # posicion en el texto de su `class`
+        self.end = end          # posicion del `class` siguiente (o el largo del texto)
+        self.reach = reach      # hasta donde pudo leer el lexer para sacar sus tokens
+        self.line = tokens[0].line
+        self.key = tuple((token.token_type.Name, token.lex, token.line - self.line, token.column) for token in tokens)
+        self.declaration = None
+        self.record = None
+        self.nodes = []
+        self.lets = []
+        self.calls = set()
+        self.outline = None
+
+    def parsed(self, declaration):
+        self.declaration = declaration
+        self.nodes = list(iter_nodes(declaration))
+        self.outline = _outline([declaration])[0]
+        # la inferencia reescribe las declaraciones de los let, se guardan para volver a chequear
+        self.lets = [(node, list(node.let_body)) for node in self.nodes if isinstance(node, LetInNode)]
+        # nombres de los metodos que llama, si cambia la firma de alguno hay que volver a chequearla
+        self.calls = {node.id.lex for node in self.nodes if isinstance(node, (FunctionCallNode, MemberCallNode))}
+
+    def restore(self):
+        for node, let_body in self.lets:
+            node.let_body[:] = let_body
+
+    def move(self, line):
+        delta = line - self.line
+        if delta:
+            for token in self.tokens:
+                token.line += delta
+            for node in self.nodes:
+                node.line += delta
+            self.line = line
+
+    def shift(self, delta):
+        self.start += delta
+        self.end += delta
+        self.reach += delta
+
+
+# resultado del chequeo y la inferencia de una clase
+class _Record:
+    def __init__(self, line, method):
+        self.line = line        # linea de la clase cuando se calcularon los mensajes
+        self.method = method    # metodo que el chequeo arrastraba al llegar a la clase
+        self.errors = []
+        self.scope = None
+        self.messages = []      # (pasada, unidad, mensaje)
+        self.checked = set()    # pasadas en que alguna unidad infirio algo
+        self.dirty = False      # quedo alguna unidad pendiente al terminar
+        self.reads = set()      # ids de miembros de otras clases que leyo
+        self.volatile = set()   # ids de miembros propios que la inferencia cambio
+
+
+def _members(typex):
+    return [*typex.methods.values(), *typex.attributes]
+
+def _state(member):
+    if isinstance(member, Method):
+        return (list(member.param_types), member.return_type, [(info.type, info.infered) for info in member.param_infos], (member.return_info.type, member.return_info.infered))
+    return member.type
+
+# compara dos estados por identidad, AutoType y ErrorType son == a cualquier tipo
+def _same(a, b):
+    if isinstance(a, (list, tuple)):
+        return type(a) is type(b) and len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    return a is b
+
+def _restore(member, state):
+    if isinstance(member, Method):
+        param_types, member.return_type, infos, (member.return_info.type, member.return_info.infered) = state
+        member.param_types[:] = param_types
+        for info, (typex, infered) in zip(member.param_infos, infos):
+            info.type, info.infered = typex, infered
+    else:
+        member.type = state
+
+# lo que leen TypeCollector y TypeBuilder, con `positions` incluye donde esta cada token (para sus errores)
+def _outline(declarations, positions=False):
+    def token(t):
+        if t is None:
+            return None
+        return (t.lex, t.line, t.column) if positions else t.lex
+
+    def feature(f):
+        if isinstance(f, AttrDeclarationNode):
+            return (token(f.id), token(f.type))
+        return (token(f.id), tuple((token(p), token(t)) for p, t in f.params), token(f.type))
+
+    return tuple((token(d.id), token(d.parent), tuple(feature(f) for f in d.features)) for d in declarations)
+
+
+# TypeInferer que anota a que unidad pertenece cada mensaje y que miembros de otras clases lee cada clase
+class _TracingInferer(TypeInferer):
+    def __init__(self, context, units, owners):
+        super().__init__(context, [], [])
+        self.positions = units  # id de unidad -> (segmento, indice de la unidad en su clase)
+        self.owners = owners    # id de miembro -> segmento de la clase que lo define
+        self.passes = 0
+        self.segment = None
+
+    def read(self, obj):
+        if self.reads is not None:
+            owner = self.owners.get(id(obj))
+            if owner is not None and owner is not self.segment:
+                self.segment.record.reads.add(id(obj))
+        super().read(obj)
+
+    def start_unit(self, unit):
+        super().start_unit(unit)
+        self.segment, self.unit = self.positions[id(unit)]
+        self.outer, self.check = self.check, False
+
+    def finish_unit(self, unit):
+        record = self.segment.record
+        for message in self.inference[self.messages:]:
+            record.messages.append((self.passes, self.unit, message))
+        if self.check:
+            record.checked.add(self.passes)
+        self.check = self.outer or self.check
+        super().finish_unit(unit)
+
+
+class CheckSession:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.text = None
+        self.segments = []
+        self.ast = None
+        self.context = None
+        self.scope = None
+        self.outline = None
+        self.positions = None
+        self.build_errors = []
+        self.pristine = {}          # id de miembro -> (miembro, estado, firma) antes de inferir
+        self.changed = set()        # ids de miembros que la inferencia dejo distintos de como estaban
+        self.incremental = False
+
+    # analiza `code` (texto o archivo abierto) y retorna (errors, inference) como analyze
+    def update(self, code):
+        for phase, result in self.phases(code):
+            pass
+        return result['errors'], result.get('inference')
+
+    # igual que update pero da cada fase a medida que termina:
+    #   ('tokens', {'tokens': cantidad})
+    #   ('parse', {'errors': [...]})      si hay error de parsing es la ultima fase
+    #   ('check', {'errors': [...]})      la inferencia no agrega errores, ya son los finales
+    #   ('inference', {'errors': [...], 'inference': [...]})
+    # Se puede dejar de consumir despues de cualquier fase (close), la sesion queda lista para el
+    # proximo analisis
+    def phases(self, code):
+        try:
+            yield from self._update(code)
+        except GeneratorExit:
+            raise
+        except BaseException:
+            # un fallo a mitad deja el estado a medias, el proximo analisis se hace completo
+            self.reset()
+            raise
+
+    def _update(self, code):
+        text = code if isinstance(code, str) else code.read()
+        segments = yield from self._split(text)
+        if segments is None:
+            yield 'parse', {'errors': self._parse_error(list(iter_tokens(text)))}
+            return
+        self.segments, self.text = segments, text
+        # hasta aca no se toco el contexto ni los resultados, el proximo analisis parte de estos segmentos
+        yield 'parse', {'errors': []}
+
+        declarations = [segment.declaration for segment in segments]
+        self.ast = ast = ProgramNode(declarations)
+
+        outline = tuple(segment.outline for segment in segments)
+        positions = _outline(declarations, True) if self.build_errors else None
+        if not self.incremental or positions != self.positions or outline != self.outline and not self._refresh(segments, outline):
+            self._build(ast)
+            self.outline = outline
+            self.positions = _outline(declarations, True) if self.build_errors else None
+            for segment in segments:
+                segment.record = None
+
+        # metodo que el chequeo arrastra al llegar a cada clase
+        methods, method = [], None
+        for declaration in declarations:
+            methods.append(method)
+            for feature in declaration.features:
+                if isinstance(feature, FuncDeclarationNode):
+                    method = (declaration.id.lex, feature.id.lex)
+
+        for segment, method in zip(segments, methods):
+            if segment.record is not None and segment.record.method != method:
+                segment.record = None
+
+        owners = {}
+        if self.incremental:
+            for segment in segments:
+                for member in _members(self.context.get_type(segment.declaration.id.lex)):
+                    owners[id(member)] = segment
+
+        chosen = {id(segment) for segment in segments if segment.record is None or segment.record.dirty}
+        streamed = cancelled = False
+        while True:
+            if self.incremental:
+                self._expand(segments, chosen)
+            selected = [(segment, method) for segment, method in zip(segments, methods) if id(segment) in chosen]
+            records, root = self._check(selected, owners)
+            if not streamed:
+                streamed = True
+                try:
+                    yield 'check', {'errors': self._errors(segments, records)}
+                except GeneratorExit:
+                    # los miembros quedaron como antes de inferir, la inferencia se termina igual
+                    cancelled = True
+            self._infer(segments, selected, records, root, owners)
+            # lo leido y cambiado en esta inferencia puede ligar clases que no se eligieron
+            if not self.incremental or not self._expand(segments, chosen, records):
+                break
+
+        for segment in segments:
+            if id(segment) in records:
+                segment.record = records[id(segment)]
+
+        self.scope = Scope()
+        tagged = []
+        for position, segment in enumerate(segments):
+            record = segment.record
+            record.scope.parent = self.scope
+            self.scope.children.append(record.scope)
+
+            delta = segment.line - record.line
+            tagged.extend((passes, position, unit, _move(message, delta)) for passes, unit, message in record.messages)
+
+        if cancelled:
+            return
+        tagged.sort(key=lambda item: item[:3])
+        yield 'inference', {'errors': self._errors(segments), 'inference': [message for *_, message in tagged]}
+
+    # errores de TypeBuilder y del chequeo de cada clase, de `records` las que se acaban de chequear
+    def _errors(self, segments, records={}):
+        errors = list(self.build_errors)
+        for segment in segments:
+            record = records.get(id(segment), segment.record)
+            delta = segment.line - record.line
+            errors.extend(_move(error, delta) for error in record.errors)
+        return errors
+
+    # parte `text` en segmentos reusando los del texto anterior, None si no empieza con una clase o
+    # alguna clase no se puede parsear (en ese caso los segmentos anteriores quedan como estaban).
+    # Da la fase de tokens cuando termina el lexer, antes de parsear
+    def _split(self, text):
+        old, segments = self.text, self.segments
+        if old == text:
+            yield 'tokens', {'tokens': sum(len(segment.tokens) for segment in segments)}
+            return segments
+
+        # los segmentos del principio que el lexer saco sin leer hasta donde empieza el cambio
+        prefix = suffix = delta = 0
+        if old is not None:
+            prefix = _common(old, text)
+            suffix = min(_common(old, text, True), len(old) - prefix, len(text) - prefix)
+            delta = len(text) - len(old)
+        count = 0
+        while count < len(segments) and segments[count].reach <= prefix:
+            count += 1
+        kept, rest = segments[:count], segments[count:]
+
+        position, line, linestart = 0, 1, 0
+        if kept:
+            first = rest[0].tokens[0]
+            position = rest[0].start
+            line, linestart = first.line, position - first.column + 1
+
+        # se lexea hasta el `class` de un segmento del sufijo comun que quede en la misma columna
+        starts = {segment.start: index for index, segment in enumerate(rest)}
+        boundary = len(text) - suffix
+        fresh, synced = [], None
+        for item in iter_positions(text, position, line, linestart):
+            token, start = item[0], item[1]
+            if token.token_type is CLASS and start >= boundary:
+                index = starts.get(start - delta)
+                if index is not None and rest[index].tokens[0].column == token.column:
+                    synced = index
+                    break
+            fresh.append(item)
+        last = item if synced is not None else fresh.pop()
+        tail = rest[synced:] if synced is not None else []
+        yield 'tokens', {'tokens': sum(len(segment.tokens) for segment in kept + tail) + len(fresh)}
+
+        if fresh and fresh[0][0].token_type is not CLASS or not kept and not fresh and synced is None:
+            return None
+
+        previous = {}
+        for segment in rest[:synced]:
+            previous.setdefault(segment.key, []).append(segment)
+
+        heads = [index for index, item in enumerate(fresh) if item[0].token_type is CLASS]
+        middle = []
+        eof = Token('$', CoolGrammar.EOF)
+        for head, tail in zip(heads, heads[1:] + [len(fresh)]):
+            items = fresh[head:tail]
+            following = fresh[tail] if tail < len(fresh) else last
+            # un error del lexer o un comentario sin cerrar hacen que el lexer lea mas alla del segmento
+            clean = following[3] == items[0][3] and not any(
+                token.token_type is OPEN and text[end:end + 1] == '*' or token.token_type is MINUS and text[end:end + 1] == '-'
+                for token, _, end, _ in items)
+            segment = _Segment([item[0] for item in items], items[0][1], following[1], following[1] + 1 if clean else float('inf'))
+
+            same = previous.get(segment.key)
+            if same:
+                middle.append((same.pop(0), segment))
+                continue
+            ast, ok = CoolParser(segment.tokens + [eof], evaluate=True)
+            if not ok:
+                return None
+            segment.parsed(ast.declarations[0])
+            middle.append((None, segment))
+
+        result = list(kept)
+        for reused, segment in middle:
+            if reused is not None:
+                reused.move(segment.line)
+                reused.start, reused.end, reused.reach = segment.start, segment.end, segment.reach
+                segment = reused
+            result.append(segment)
+
+        if synced is not None:
+            moved = last[0].line - rest[synced].line
+            for segment in rest[synced:]:
+                segment.move(segment.line + moved)
+                segment.shift(delta)
+                result.append(segment)
+        return result
+
+    def _parse_error(self, tokens):
+        ast, ok = CoolParser(tokens, evaluate=True)
+        if ok:
+            raise AssertionError('the program parses but one of its classes does not')
+        return [PARSE_ERROR % (ast.lex, ast.line, ast.column)]
+
+    def _build(self, ast):
+        errors = []
+        collector = TypeCollector(errors)
+        collector.visit(ast)
+        collected = bool(errors)
+
+        self.context = context = collector.context
+        TypeBuilder(context, errors).visit(ast)
+        self.build_errors = errors
+
+        # con clases repetidas o herencia ciclica (el chequeo cambia el padre de los tipos del ciclo) no se reusa nada
+        object_type = context.get_type('Object')
+        self.incremental = not collected and all(context.get_type(declaration.id.lex).indexed_with(object_type) for declaration in ast.declarations)
+
+        self.pristine = {}
+        self.changed = set()
+        if self.incremental:
+            for declaration in ast.declarations:
+                for member in _members(context.get_type(declaration.id.lex)):
+                    self.pristine[id(member)] = (member, _state(member), signature(member))
+
+    # vuelve a construir en el contexto los miembros de las clases cuya firma cambio y los de sus
+    # descendientes (que pueden chocar con atributos heredados). Olvida el resultado de las clases
+    # que dependen de esos miembros: las reconstruidas, las que llaman a un metodo que cambio de
+    # firma, las que arrastran un metodo de ellas y las que leyeron alguno al inferir. Retorna False
+    # si hay que construir todo de nuevo
+    def _refresh(self, segments, outline):
+        if self.build_errors or [entry[:2] for entry in outline] != [entry[:2] for entry in self.outline]:
+            return False
+
+        context = self.context
+        types = [context.get_type(entry[0]) for entry in outline]
+        changed, names = set(), set()
+        for typex, new, old in zip(types, outline, self.outline):
+            if new != old:
+                changed.add(id(typex))
+                before = {feature[0]: feature for feature in old[2] if len(feature) == 3}
+                after = {feature[0]: feature for feature in new[2] if len(feature) == 3}
+                names |= {name for name in before.keys() | after.keys() if before.get(name) != after.get(name)}
+
+        rebuilt = [(segment, typex) for segment, typex in zip(segments, types) if any(id(ancestor) in changed for ancestor in typex.ancestors())]
+        # los padres antes que los hijos
+        rebuilt.sort(key=lambda item: len(list(item[1].ancestors())))
+
+        # el indice de la jerarquia se reconstruye una vez al final y no con cada miembro
+        context.hierarchy.pause()
+        try:
+            stale = []
+            for _, typex in rebuilt:
+                stale.extend(_members(typex))
+                typex.attributes, typex.methods = [], {}
+                typex.parent = None
+
+            errors = []
+            builder = TypeBuilder(context, errors)
+            for segment, typex in rebuilt:
+                builder.visit(segment.declaration)
+        finally:
+            context.hierarchy.resume()
+        if errors or context.get_type('Main').find_method('main') is None:
+            return False
+
+        stale_ids = {id(member) for member in stale}
+        for key in stale_ids:
+            del self.pristine[key]
+        self.changed -= stale_ids
+        for _, typex in rebuilt:
+            for member in _members(typex):
+                self.pristine[id(member)] = (member, _state(member), signature(member))
+
+        classes = {typex.name for _, typex in rebuilt}
+        for segment in segments:
+            record = segment.record
+            if record is not None and (segment.declaration.id.lex in classes or segment.calls & names or record.reads & stale_ids
+                                       or record.method is not None and record.method[0] in classes):
+                segment.record = None
+
+        self.outline = outline
+        return True
+
+    # agrega a `chosen` las clases ligadas a las elegidas, segun lo que cada una leyo y cambio en su
+    # ultima inferencia (y en `records`, la que se acaba de hacer); retorna si agrego alguna
+    def _expand(self, segments, chosen, records={}):
+        added = False
+        while True:
+            changing, wanted = set(), set()
+            for segment in segments:
+                if id(segment) not in chosen:
+                    continue
+                for record in (segment.record, records.get(id(segment))):
+                    if record is None:
+                        # sin inferencia previa cualquier miembro suyo puede cambiar
+                        changing.update(id(member) for member in _members(self.context.get_type(segment.declaration.id.lex)))
+                    else:
+                        changing |= record.volatile
+                        wanted |= record.reads
+
+            grown = [segment for segment in segments if id(segment) not in chosen and (segment.record.reads & changing or segment.record.volatile & wanted)]
+            if not grown:
+                return added
+            chosen.update(id(segment) for segment in grown)
+            added = True
+
+    # chequea las clases elegidas (con el metodo que arrastran), las demas conservan su resultado
+    def _check(self, selected, owners):
+        context = self.context
+        if not selected:
+            return {}, None
+        chosen = {id(segment) for segment, _ in selected}
+
+        # el chequeo ve los miembros como quedaron despues de TypeBuilder
+        finals = {key: _state(self.pristine[key][0]) for key in self.changed if id(owners[key]) not in chosen}
+        for key in self.changed:
+            member, state, _ = self.pristine[key]
+            _restore(member, state)
+
+        records = {}
+        root = Scope()
+        for segment, method in selected:
+            record = records[id(segment)] = _Record(segment.line, method)
+            segment.restore()
+            checker = TypeChecker(context, record.errors)
+            checker.current_method = None if method is None else context.get_type(method[0]).get_method(method[1])
+            record.scope = root.create_child()
+            checker.visit(segment.declaration, record.scope)
+
+        for key, state in finals.items():
+            _restore(self.pristine[key][0], state)
+
+        return records, root
+
+    # infiere las clases chequeadas en `records`, sigue mientras alguna clase infiera algo
+    def _infer(self, segments, selected, records, root, owners):
+        context = self.context
+        if not selected:
+            return
+        chosen = {id(segment) for segment, _ in selected}
+
+        previous = {id(segment): segment.record for segment, _ in selected}
+        for segment, _ in selected:
+            segment.record = records[id(segment)]
+
+        units = {}
+        for segment, _ in selected:
+            declaration = segment.declaration
+            units[id(declaration)] = (segment, len(declaration.features))
+            for index, feature in enumerate(declaration.features):
+                units[id(feature)] = (segment, index)
+
+        # se sigue mientras alguna clase infiera algo, tambien las que no se vuelven a inferir
+        checked = set()
+        for segment in segments:
+            if id(segment) not in chosen:
+                checked |= segment.record.checked
+
+        inferer = _TracingInferer(context, units, owners)
+        program = ProgramNode([segment.declaration for segment, _ in selected])
+        while True:
+            inferer.passes += 1
+            if not inferer.visit(program, root) and inferer.passes not in checked:
+                break
+
+        for unit in inferer.dirty:
+            inferer.positions[id(unit)][0].record.dirty = True
+
+        for segment, _ in selected:
+            for member in _members(context.get_type(segment.declaration.id.lex)):
+                key = id(member)
+                if key not in self.pristine:
+                    continue
+                _, state, sign = self.pristine[key]
+                if not _same(_state(member), state):
+                    self.changed.add(key)
+                else:
+                    self.changed.discard(key)
+                if signature(member) != sign:
+                    segment.record.volatile.add(key)
+
+        for segment, _ in selected:
+            segment.record = previous[id(segment)]
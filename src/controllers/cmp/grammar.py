@@ -1,4 +1,10 @@
-from .pycompiler import Grammar, Item
+import hashlib
+import os
+import pickle
+import warnings
+from array import array
+
+from .pycompiler import Grammar, Item, AttributeProduction
 from .automata import State
 from .utils import ContainerSet
 
@@ -124,50 +130,226 @@ class Action(tuple):
 
 
 class ShiftReduceParser:
-    def __init__(self, G, verbose = False):
+    def __init__(self, G, verbose = False, cache = None):
         self.G = G
         self.verbose = verbose
         self.action = {}
         self.goto = {}
-        self._build_parsing_table()
+
+        # `cache` es la ruta de un archivo donde se guardan las tablas ya construidas,
+        # si la gramatica no ha cambiado se cargan de ahi en lugar de construir el automata
+        if cache is None or not self._load_parsing_table(cache):
+            self._build_parsing_table()
+            if cache is not None:
+                self._save_parsing_table(cache)
+
+        self._compile_parsing_table()
 
     def _build_parsing_table(self):
         raise NotImplementedError()
 
-    def __call__(self, w):
+    @property
+    def fingerprint(self):
+        data = type(self).__name__ + self.G.to_json
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def _load_parsing_table(self, path):
+        try:
+            with open(path, 'rb') as file:
+                data = pickle.load(file)
+        except Exception:
+            return False
+
+        if not isinstance(data, dict) or data.get('fingerprint') != self.fingerprint:
+            return False
+
+        # las producciones se recuperan por su indice para que las reglas (lambdas) queden enlazadas
+        productions = self.G.Productions
+        action, goto = {}, {}
+
+        for state, row in data['action'].items():
+            action[state] = cells = {}
+            for name, entries in row.items():
+                cells[self.G[name]] = [Action((act, productions[tag] if act == Action.REDUCE else tag)) for act, tag in entries]
+
+        for state, row in data['goto'].items():
+            goto[state] = {self.G[name]: list(entries) for name, entries in row.items()}
+
+        if None in (symbol for row in action.values() for symbol in row):
+            return False
+
+        self.action, self.goto = action, goto
+        self.is_lr1 = data['is_lr1']
+        return True
+
+    def _save_parsing_table(self, path):
+        index = {production: i for i, production in enumerate(self.G.Productions)}
+
+        data = {
+            'fingerprint': self.fingerprint,
+            'is_lr1': getattr(self, 'is_lr1', True),
+            'action': {
+                state: {
+                    symbol.Name: [(act, index[tag] if act == Action.REDUCE else tag) for act, tag in entries]
+                    for symbol, entries in row.items()
+                }
+                for state, row in self.action.items()
+            },
+            'goto': {
+                state: {symbol.Name: list(entries) for symbol, entries in row.items()}
+                for state, row in self.goto.items()
+            },
+        }
+
+        # se escribe en un temporal y luego se renombra, asi varios procesos pueden arrancar a la vez
+        temp = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(temp, 'wb') as file:
+                pickle.dump(data, file, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, path)
+        except OSError:
+            try:
+                os.remove(temp)
+            except OSError:
+                pass
+
+    # las tablas se aplanan en arreglos de enteros indexados por `estado * cantidad_de_simbolos + Symbol.Index`:
+    # en action 0 es error, n > 0 es shift al estado n - 1 y n < 0 es reduce por la produccion -n - 1
+    # (la produccion len(G.Productions) es la del simbolo inicial aumentado, o sea OK)
+    def _compile_parsing_table(self):
+        productions = self.G.Productions
+        index = {production: i for i, production in enumerate(productions)}
+
+        terminals = len(self.G.terminals) + 1
+        nonterminals = len(self.G.nonTerminals)
+        states = max(list(self.action) + list(self.goto)) + 1
+
+        action = array('i', [0]) * (states * terminals)
+        goto = array('i', [-1]) * (states * nonterminals)
+
+        for state, row in self.action.items():
+            for symbol, cell in row.items():
+                act, tag = cell[0]
+                if act == Action.SHIFT:
+                    code = tag + 1
+                elif act == Action.REDUCE:
+                    code = -index[tag] - 1
+                else:
+                    code = -len(productions) - 1
+                action[state * terminals + symbol.Index] = code
+
+        for state, row in self.goto.items():
+            for symbol, cell in row.items():
+                goto[state * nonterminals + symbol.Index] = cell[0]
+
+        self._action_table = action
+        self._goto_table = goto
+        self._terminals = terminals
+        self._nonterminals = nonterminals
+        self._lengths = [len(production.Right) for production in productions]
+        self._lefts = [production.Left.Index for production in productions]
+
+        if self.G.pType is AttributeProduction:
+            assert all(rule is None for production in productions for rule in production.attributes[1:]), \
+                'There must be only synteticed attributes.'
+            self._rules = [production.attributes[0] for production in productions]
+        else:
+            self._rules = None
+
+    def __call__(self, w, evaluate = False):
+        if evaluate:
+            return self._evaluate(w)
+
+        action, goto = self._action_table, self._goto_table
+        terminals, nonterminals = self._terminals, self._nonterminals
+        productions, lengths, lefts = self.G.Productions, self._lengths, self._lefts
+        accept = len(productions)
+        shift, reduce = Action.SHIFT, Action.REDUCE
+        verbose = self.verbose
+
+        # w puede ser cualquier iterable de tokens (una lista o el generador del lexer)
+        tokens = iter(w)
+        lookahead = next(tokens)
+
         stack = [0]
-        cursor = 0
+        state = 0
         output, operations = [], []
+        push, emit, record = stack.append, output.append, operations.append
 
         while True:
-            state = stack[-1]
-            # se cambio aqui y para en caso de error poder devolver el token y asi poder tomar la linea y la columna del error.
-            lookahead = w[cursor].token_type
-            if self.verbose:
-                print(stack, w[cursor:])
-
-            try:
-                action, tag = self.action[state][lookahead][0]
-                if action == Action.SHIFT:
-                    stack.append(tag)
-                    cursor += 1
-                    operations.append(action)
-                elif action == Action.REDUCE:
-                    for _ in range(len(tag.Right)):
-                        stack.pop()
-                    stack.append(self.goto[stack[-1]][tag.Left][0])
-                    output.append(tag)
-                    operations.append(action)
-                elif action == Action.OK:
-                    # output.reverse()
+            if verbose:
+                print(stack, lookahead)
+
+            code = action[state * terminals + lookahead.token_type.Index]
+            if code > 0:
+                state = code - 1
+                push(state)
+                lookahead = next(tokens)
+                record(shift)
+            elif code < 0:
+                production = -code - 1
+                if production == accept:
                     return output, operations
-                else:
-                    assert False, 'Must be something wrong!'
-            except KeyError:
-                #print('Parsing Error:', stack, w[cursor:])
+
+                size = lengths[production]
+                if size:
+                    del stack[-size:]
+                state = goto[stack[-1] * nonterminals + lefts[production]]
+                push(state)
+                emit(productions[production])
+                record(reduce)
+            else:
                 # cambio para retornar el Token donde dio error y con ello tomar la linea y la columna del error
                 # esto deberia retornar el parse y las operaciones, pero en lugar del parser retornamos el token donde hubo error
-                return w[cursor], None
+                return lookahead, None
+
+    # igual que __call__ pero con una pila de valores al lado de la de estados: cada reduce evalua
+    # la regla de la produccion en ese momento, asi se obtiene el AST en una sola pasada.
+    # Retorna (valor, True) o, si hay error, (token donde fallo, False)
+    def _evaluate(self, w):
+        assert self._rules is not None, 'Evaluation requires an attributed grammar.'
+
+        action, goto = self._action_table, self._goto_table
+        terminals, nonterminals = self._terminals, self._nonterminals
+        rules, lengths, lefts = self._rules, self._lengths, self._lefts
+        accept = len(rules)
+        verbose = self.verbose
+
+        tokens = iter(w)
+        lookahead = next(tokens)
+
+        stack = [0]
+        values = []
+        state = 0
+        push, store = stack.append, values.append
+
+        while True:
+            if verbose:
+                print(stack, lookahead)
+
+            code = action[state * terminals + lookahead.token_type.Index]
+            if code > 0:
+                state = code - 1
+                push(state)
+                store(lookahead)
+                lookahead = next(tokens)
+            elif code < 0:
+                production = -code - 1
+                if production == accept:
+                    return values[-1], True
+
+                size = lengths[production]
+                if size:
+                    del stack[-size:]
+                    synteticed = [None] + values[-size:]
+                    del values[-size:]
+                    store(rules[production](None, synteticed))
+                else:
+                    store(rules[production](None, None))
+                state = goto[stack[-1] * nonterminals + lefts[production]]
+                push(state)
+            else:
+                return lookahead, False
 
 
 class LR1Parser(ShiftReduceParser):
@@ -203,15 +385,12 @@ class LR1Parser(ShiftReduceParser):
     def closure_lr1(items, firsts):
         closure = ContainerSet(*items)
 
-        changed = True
-        while changed:
-            changed = False
-
-            new_items = ContainerSet()
-            for item in closure:
-                new_items.extend(LR1Parser.expand(item, firsts))
-
-            changed = closure.update(new_items)
+        # cada item se expande una sola vez, solo los nuevos entran en la lista de pendientes
+        pending = list(closure)
+        while pending:
+            for new_item in LR1Parser.expand(pending.pop(), firsts):
+                if closure.add(new_item):
+                    pending.append(new_item)
 
         return LR1Parser.compress(closure)
 
@@ -261,6 +440,11 @@ class LR1Parser(ShiftReduceParser):
 
         self.automaton = automaton
 
+    @property
+    def conflicts(self):
+        return [(state, symbol) for table in (self.action, self.goto)
+                for state, row in table.items() for symbol, cell in row.items() if len(cell) > 1]
+
     def _build_parsing_table(self):
         self.is_lr1 = True
         self.build_LR1_automaton()
@@ -292,3 +476,83 @@ class LR1Parser(ShiftReduceParser):
                         self.is_lr1 &= GrammarHelp._register(self.goto, idx, next_symbol,
                                                               node[next_symbol.Name][0].idx)
                 pass
+
+
+class GrammarConflictWarning(UserWarning):
+    pass
+
+
+class LALR1Parser(LR1Parser):
+    @staticmethod
+    def core(items):
+        return frozenset(item.Center() for item in items)
+
+    # los estados con el mismo nucleo LR(0) se mezclan a medida que aparecen (uniendo los lookaheads),
+    # si un estado ya visitado gana lookaheads nuevos se vuelve a procesar para propagarlos
+    def build_LR1_automaton(self):
+        G = self.augmentedG = self.G.AugmentedGrammar(True)
+
+        firsts = GrammarHelp.compute_firsts(G)
+        firsts[G.EOF] = ContainerSet(G.EOF)
+
+        start_production = G.startSymbol.productions[0]
+        start_item = Item(start_production, 0, lookaheads=(G.EOF,))
+        start = frozenset([start_item])
+
+        closure = LR1Parser.closure_lr1(start, firsts)
+        automaton = State(frozenset(closure), True)
+
+        start_core = LALR1Parser.core(start)
+        pending = [start_core]
+        kernels = {start_core: start}
+        visited = {start_core: automaton}
+
+        while pending:
+            current = pending.pop()
+            current_state = visited[current]
+
+            for symbol in G.terminals + G.nonTerminals:
+                kernel = LR1Parser.goto_lr1(current_state.state, symbol, just_kernel=True)
+
+                if not kernel:
+                    continue
+
+                core = LALR1Parser.core(kernel)
+
+                try:
+                    next_state = visited[core]
+                except KeyError:
+                    kernels[core] = kernel
+                    visited[core] = next_state = State(frozenset(LR1Parser.closure_lr1(kernel, firsts)), True)
+                    pending.append(core)
+                else:
+                    merged = frozenset(LR1Parser.compress(kernels[core] | kernel))
+                    if merged != kernels[core]:
+                        kernels[core] = merged
+                        next_state.state = frozenset(LR1Parser.closure_lr1(merged, firsts))
+                        pending.append(core)
+
+                current_state[symbol.Name] = [next_state]
+
+        self.automaton = automaton
+
+    def __init__(self, G, verbose = False, cache = None):
+        super().__init__(G, verbose, cache)
+        # tambien con las tablas del cache: una gramatica con conflictos no se resuelve en silencio
+        self.is_lalr1 = self.is_lr1
+        if not self.is_lalr1:
+            self._report_conflicts()
+
+    def _report_conflicts(self):
+        conflicts = self.conflicts
+        if self.verbose:
+            for state, symbol in conflicts:
+                print(f'LALR(1) conflict in state {state} on "{symbol}"')
+
+        symbols = ', '.join(sorted({f'"{symbol}"' for _, symbol in conflicts}))
+        # si LR(1) no tiene conflictos los creo la mezcla de estados con el mismo nucleo
+        if LR1Parser(self.G).is_lr1:
+            message = f'LALR(1) conflicts that LR(1) does not have (merged states) on {symbols}'
+        else:
+            message = f'the grammar is not LR(1), conflicts on {symbols}'
+        warnings.warn(f'{message}; the parser takes the first action of each conflict', GrammarConflictWarning, stacklevel=3)
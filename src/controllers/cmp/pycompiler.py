@@ -5,6 +5,8 @@ class Symbol(object):
     def __init__(self, name, grammar):
         self.Name = name
         self.Grammar = grammar
+        # numeracion densa que asigna la gramatica (terminales y no terminales por separado)
+        self.Index = None
 
     def __str__(self):
         return self.Name
@@ -285,6 +287,7 @@ class Grammar():
         self.pType = None
         self.Epsilon = Epsilon(self)
         self.EOF = EOF(self)
+        self.EOF.Index = 0
 
         self.symbDict = { '$': self.EOF }
 
@@ -295,6 +298,7 @@ class Grammar():
             raise Exception("Empty name")
 
         term = NonTerminal(name,self)
+        term.Index = len(self.nonTerminals)
 
         if startSymbol:
 
@@ -335,6 +339,7 @@ class Grammar():
             raise Exception("Empty name")
 
         term = Terminal(name, self)
+        term.Index = len(self.terminals) + 1
         self.terminals.append(term)
         self.symbDict[name] = term
         return term
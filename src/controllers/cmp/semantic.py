@@ -1,5 +1,3 @@
-import itertools as itt
-
 class SemanticError(Exception):
     @property
     def text(self):
@@ -39,9 +37,23 @@ class Type:
         self.name = name
         self.attributes = []
         self.methods = {}
-        self.parent = None
+        self.hierarchy = None
+        self.attribute_table = None
+        self.method_table = None
+        self._parent = None
         self.sealed = sealed
 
+    # cambiar el padre invalida el indice de la jerarquia, se reconstruye en la proxima consulta
+    @property
+    def parent(self):
+        return self._parent
+
+    @parent.setter
+    def parent(self, parent):
+        self._parent = parent
+        if self.hierarchy is not None:
+            self.hierarchy.moved(self)
+
     def set_parent(self, parent):
         if self.parent is not None:
             raise SemanticError(f'Parent type is already set for {self.name}.')
@@ -53,60 +65,101 @@ class Type:
         if self == other:
             return other if not isinstance(other, AutoType) else self
 
-        p1, p2 = [self], [other]
-        while p1[-1] != None:
-            p1.append(p1[-1].parent)
+        if self.indexed_with(other):
+            return self.hierarchy.lca(self, other)
 
-        while p2[-1] != None:
-            p2.append(p2[-1].parent)
+        p1, p2 = list(self.ancestors()) + [None], list(other.ancestors()) + [None]
 
-        while p1[-2] == p2[-2]:
+        while len(p1) > 1 and len(p2) > 1 and p1[-2] == p2[-2]:
             p1.pop()
             p2.pop()
 
         return p1[-1]
 
+    # True si ambos tipos estan numerados en el mismo indice (valido) de la jerarquia
+    def indexed_with(self, other):
+        hierarchy = self.hierarchy
+        if hierarchy is None or other.hierarchy is not hierarchy or hierarchy.paused:
+            return False
+        if not hierarchy.valid:
+            hierarchy.build()
+            return self.hierarchy is hierarchy and other.hierarchy is hierarchy
+        return True
+
+    def indexed(self):
+        hierarchy = self.hierarchy
+        if hierarchy is None or hierarchy.paused:
+            return False
+        if not hierarchy.valid:
+            hierarchy.build()
+        return self.hierarchy is not None
+
+    # el tipo y sus ancestros, se detiene si la herencia es ciclica
+    def ancestors(self):
+        typex, seen = self, set()
+        while typex is not None and id(typex) not in seen:
+            seen.add(id(typex))
+            yield typex
+            typex = typex.parent
+
+    # un miembro nuevo no cambia la numeracion, solo las tablas del tipo y de sus descendientes
+    def refresh_tables(self):
+        if self.hierarchy is not None:
+            self.hierarchy.refresh(self)
+
+    # find_* retornan None si el miembro no existe, get_* lanzan SemanticError
+    def find_attribute(self, name:str):
+        if self.indexed():
+            return self.attribute_table.get(name)
+        for typex in self.ancestors():
+            for attr in typex.attributes:
+                if attr.name == name:
+                    return attr
+        return None
+
     def get_attribute(self, name:str):
-        try:
-            return next(attr for attr in self.attributes if attr.name == name)
-        except StopIteration:
-            if self.parent is None:
-                raise SemanticError(f'Attribute "{name}" is not defined in {self.name}.')
-            try:
-                return self.parent.get_attribute(name)
-            except SemanticError:
-                raise SemanticError(f'Attribute "{name}" is not defined in {self.name}.')
+        attribute = self.find_attribute(name)
+        if attribute is None:
+            raise SemanticError(f'Attribute "{name}" is not defined in {self.name}.')
+        return attribute
 
     def define_attribute(self, name:str, typex):
-        try:
-            self.get_attribute(name)
-        except SemanticError:
-            attribute = Attribute(name, typex)
-            self.attributes.append(attribute)
-            return attribute
-        else:
+        if self.find_attribute(name) is not None:
             raise SemanticError(f'Attribute "{name}" is already defined in {self.name}.')
 
+        attribute = Attribute(name, typex)
+        self.attributes.append(attribute)
+        self.refresh_tables()
+        return attribute
+
+    def find_method(self, name:str):
+        if self.indexed():
+            return self.method_table.get(name)
+        for typex in self.ancestors():
+            if name in typex.methods:
+                return typex.methods[name]
+        return None
+
     def get_method(self, name:str):
-        try:
-            return self.methods[name]
-        except KeyError:
-            if self.parent is None:
-                raise SemanticError(f'Method "{name}" is not defined in {self.name}.')
-            try:
-                return self.parent.get_method(name)
-            except SemanticError:
-                raise SemanticError(f'Method "{name}" is not defined in {self.name}.')
+        method = self.find_method(name)
+        if method is None:
+            raise SemanticError(f'Method "{name}" is not defined in {self.name}.')
+        return method
 
     def define_method(self, name:str, param_names:list, param_types:list, return_type):
         if name in self.methods:
             raise SemanticError(f'Method "{name}" already defined in {self.name}')
 
         method = self.methods[name] = Method(name, param_names, param_types, return_type)
+        self.refresh_tables()
         return method
 
     def conforms_to(self, other):
-        return other.bypass() or self == other or self.parent is not None and self.parent.conforms_to(other)
+        if other.bypass():
+            return True
+        if self.indexed_with(other):
+            return other.pre <= self.pre and self.post <= other.post
+        return any(typex == other for typex in self.ancestors())
 
     def bypass(self):
         return False
@@ -178,6 +231,7 @@ class ErrorType(Type):
 class Context:
     def __init__(self):
         self.types = {}
+        self.hierarchy = None
 
     def create_type(self, name:str):
         if name in self.types:
@@ -197,12 +251,154 @@ class Context:
         except KeyError:
             raise SemanticError(f'Type "{name}" is not defined.')
 
+    # numera la jerarquia de tipos, despues de esto conforms_to y join_type no recorren los padres
+    def build_hierarchy(self):
+        self.hierarchy = Hierarchy(self)
+        return self.hierarchy
+
     def __str__(self):
         return '{\n\t' + '\n\t'.join(y for x in self.types.values() for y in str(x).split('\n')) + '\n}'
 
     def __repr__(self):
         return str(self)
 
+class Hierarchy:
+    """Indice de la jerarquia de tipos de un contexto.
+
+    Cada tipo alcanzable desde una raiz (un tipo sin padre) recibe los numeros
+    `pre` y `post` de un recorrido en profundidad, asi `a` conforma a `b` si el
+    intervalo de `a` esta dentro del de `b`. Ademas guarda en `jumps` los
+    ancestros a distancia 1, 2, 4, ... (binary lifting) para calcular el ancestro
+    comun mas cercano en O(log n). `attribute_table` y `method_table` son los
+    miembros del tipo y de todos sus ancestros por nombre (el del tipo mas
+    cercano gana).
+
+    Los tipos que quedan en un ciclo de herencia no son alcanzables desde ninguna
+    raiz y no se numeran (`hierarchy` es None), para ellos se recorren los padres.
+
+    Cambiar un padre obliga a numerar todo de nuevo (en la proxima consulta), un
+    miembro nuevo solo rehace las tablas del tipo y de sus descendientes. Entre
+    `pause()` y `resume()` las consultas recorren los padres y los cambios se
+    anotan: al terminar se numera una sola vez si algun padre cambio de verdad, y
+    si no solo se rehacen las tablas de los tipos que cambiaron.
+    """
+
+    def __init__(self, context):
+        self.context = context
+        self.valid = False
+        self.paused = False
+        self.changed = []       # tipos cambiados durante la pausa
+        self.build()
+
+    # para cambiar muchos tipos seguidos (CheckSession._refresh vuelve a construir clases enteras)
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+        changed = list({id(typex): typex for typex in self.changed}.values())
+        self.changed = []
+        # si cada tipo quedo con el padre con que se numero basta con rehacer las tablas, las de
+        # un tipo ya incluyen a sus descendientes
+        if self.valid and all(typex.hierarchy is self and typex.parent is (typex.jumps[0] if typex.jumps else None) for typex in changed):
+            end = -1
+            for typex in sorted(changed, key=lambda typex: typex.pre):
+                if typex.pre > end:
+                    self.refresh(typex)
+                    end = typex.post
+        else:
+            self.build()
+
+    # el padre de `typex` cambio
+    def moved(self, typex):
+        if self.paused:
+            self.changed.append(typex)
+        else:
+            self.valid = False
+
+    # `typex` tiene un miembro nuevo: rehace sus tablas y las de sus descendientes
+    def refresh(self, typex):
+        if self.paused:
+            self.changed.append(typex)
+            return
+        if not self.valid or typex.hierarchy is not self:
+            return
+
+        parent = typex.parent
+        self.tables(typex, {} if parent is None else parent.attribute_table, {} if parent is None else parent.method_table)
+        stack = [typex]
+        while stack:
+            typex = stack.pop()
+            for child in self.children.get(id(typex), ()):
+                self.tables(child, typex.attribute_table, typex.method_table)
+                stack.append(child)
+
+    def build(self):
+        types = list(self.context.types.values())
+        children = {}
+        roots = []
+        for typex in types:
+            typex.hierarchy = None
+            if typex.parent is None:
+                roots.append(typex)
+            else:
+                children.setdefault(id(typex.parent), []).append(typex)
+
+        self.children = children
+        counter = 0
+        for root in roots:
+            root.hierarchy = self
+            root.jumps = []
+            self.tables(root, {}, {})
+            root.pre = counter
+            counter += 1
+            stack = [(root, iter(children.get(id(root), ())))]
+            while stack:
+                typex, pending = stack[-1]
+                child = next(pending, None)
+                if child is None:
+                    typex.post = counter
+                    counter += 1
+                    stack.pop()
+                    continue
+
+                child.hierarchy = self
+                self.tables(child, typex.attribute_table, typex.method_table)
+                child.jumps = jumps = [typex]
+                while len(jumps) <= len(jumps[-1].jumps):
+                    jumps.append(jumps[-1].jumps[len(jumps) - 1])
+                child.pre = counter
+                counter += 1
+                stack.append((child, iter(children.get(id(child), ()))))
+
+        self.valid = True
+
+    @staticmethod
+    def tables(typex, attributes, methods):
+        typex.attribute_table = dict(attributes)
+        for attr in reversed(typex.attributes):
+            typex.attribute_table[attr.name] = attr
+        typex.method_table = dict(methods)
+        typex.method_table.update(typex.methods)
+
+    # ancestro comun mas cercano, None si los tipos estan en arboles distintos
+    def lca(self, a, b):
+        if b.pre <= a.pre and a.post <= b.post:
+            return b
+        if a.pre <= b.pre and b.post <= a.post:
+            return a
+
+        for k in range(len(a.jumps) - 1, -1, -1):
+            if k < len(a.jumps):
+                up = a.jumps[k]
+                if not (up.pre <= b.pre and b.post <= up.post):
+                    a = up
+
+        if not a.jumps:
+            return None
+        up = a.jumps[0]
+        return up if up.pre <= b.pre and b.post <= up.post else None
+
 class VariableInfo:
     def __init__(self, name, vtype):
         self.name = name
@@ -212,6 +408,7 @@ class VariableInfo:
 class Scope:
     def __init__(self, parent=None):
         self.locals = []
+        self.names = {}
         self.parent = parent
         self.children = []
         self.index = 0 if parent is None else len(parent)
@@ -224,20 +421,28 @@ class Scope:
         self.children.append(child)
         return child
 
+    # `names` guarda la primera definicion de cada nombre junto a su posicion en `locals`,
+    # un hijo solo ve las variables del padre definidas antes de crearse (posicion < index)
     def define_variable(self, vname, vtype):
         info = VariableInfo(vname, vtype)
+        self.names.setdefault(vname, (len(self.locals), info))
         self.locals.append(info)
         return info
 
+    def lookup(self, vname, index=None):
+        scope = self
+        while scope is not None:
+            entry = scope.names.get(vname)
+            if entry is not None and (index is None or entry[0] < index):
+                return entry[1]
+            scope, index = scope.parent, scope.index
+        return None
+
     def find_variable(self, vname, index=None):
-        locals = self.locals if index is None else itt.islice(self.locals, index)
-        try:
-            return next(x for x in locals if x.name == vname)
-        except StopIteration:
-            return self.parent.find_variable(vname, self.index) if self.parent is not None else None
+        return self.lookup(vname, index)
 
     def is_defined(self, vname):
-        return self.find_variable(vname) is not None
+        return self.lookup(vname) is not None
 
     def is_local(self, vname):
-        return any(True for x in self.locals if x.name == vname)
\ No newline at end of file
+        return vname in self.names
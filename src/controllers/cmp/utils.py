@@ -1,3 +1,5 @@
+from array import array
+
 class ContainerSet:
     def __init__(self, *values, contains_epsilon=False):
         self.set = set(values)
@@ -71,6 +73,8 @@ class Token:
         Token's type.
     """
 
+    __slots__ = ('lex', 'token_type', 'line', 'column')
+
     def __init__(self, lex, token_type, line=0, column=0):
         self.lex = lex
         self.token_type = token_type
@@ -86,3 +90,104 @@ class Token:
     @property
     def is_valid(self):
         return True
+
+
+class TokenBuffer:
+    """
+    Columnar storage for a token stream.
+
+    Token types, offsets, lines and columns are kept in parallel arrays and
+    the lexemes are sliced from the source text on demand. Indexing or
+    iterating the buffer yields regular `Token` objects, so it can be given
+    to the parser or to `evaluate_reverse_parse` in place of a token list.
+
+    Parameters
+    ----------
+    source : str
+        Text the tokens were read from.
+    symbols : list
+        Token types indexed by type id.
+    values : dict
+        Maps a type id to a function that turns the raw lexeme into the token's value.
+    """
+
+    def __init__(self, source, symbols, values=None):
+        self.source = source
+        self.symbols = symbols
+        self.values = values or {}
+        self.types = array('i')
+        self.starts = array('q')
+        self.ends = array('q')
+        self.lines = array('i')
+        self.columns = array('i')
+
+    def append(self, type_id, start, end, line=0, column=0):
+        self.types.append(type_id)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+        self.columns.append(column)
+
+    def lexeme(self, index):
+        return self.source[self.starts[index]:self.ends[index]]
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        type_id = self.types[index]
+        lex = self.lexeme(index)
+        convert = self.values.get(type_id)
+        return Token(convert(lex) if convert else lex, self.symbols[type_id], self.lines[index], self.columns[index])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class DisjointSet:
+    """
+    Union-find over hashable items, with path compression and union by rank.
+
+    Items are added on first use, so `find` and `union` accept items that
+    were never added explicitly.
+    """
+
+    def __init__(self, *items):
+        self.parents = {}
+        self.ranks = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        if item not in self.parents:
+            self.parents[item] = item
+            self.ranks[item] = 0
+
+    def find(self, item):
+        self.add(item)
+        root = item
+        while self.parents[root] is not root:
+            root = self.parents[root]
+        while self.parents[item] is not root:
+            self.parents[item], item = root, self.parents[item]
+        return root
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a is b:
+            return a
+        if self.ranks[a] < self.ranks[b]:
+            a, b = b, a
+        self.parents[b] = a
+        if self.ranks[a] == self.ranks[b]:
+            self.ranks[a] += 1
+        return a
+
+    def __contains__(self, item):
+        return item in self.parents
+
+    def __len__(self):
+        return len(self.parents)
@@ -21,8 +21,9 @@
 # THE SOFTWARE.
 
 import inspect
+from types import GeneratorType
 
-__all__ = ['on', 'when']
+__all__ = ['on', 'when', 'Visitor']
 
 def on(param_name):
   def f(fn):
@@ -46,30 +47,139 @@ def when(param_type):
   return f
 
 
+class Visitor(object):
+  # Base class for visitors written with `on`/`when`. Each dispatched method
+  # is replaced by a descriptor that hands every instance a plain function
+  # over the dispatcher's {node_class: target} table, so `self.visit(node)`
+  # is one dict lookup plus the call to the target.
+  #
+  # A target may also be a generator. Instead of calling `self.visit(child,
+  # *args)` it does `value = yield child, *args`; the child is visited by a
+  # loop with an explicit stack (see `trampoline`) and its result is sent
+  # back. Targets written this way don't use Python recursion, so the depth
+  # of the tree is not limited by sys.getrecursionlimit().
+  def __init_subclass__(cls, **kw):
+    super().__init_subclass__(**kw)
+    for name, value in list(vars(cls).items()):
+      dispatcher = value if isinstance(value, Dispatcher) else getattr(value, 'dispatcher', None)
+      if isinstance(dispatcher, Dispatcher):
+        setattr(cls, name, VisitMethod(name, dispatcher))
+
+
+class VisitMethod(object):
+  def __init__(self, name, dispatcher):
+    self.name = name
+    self.dispatcher = dispatcher
+
+  def __get__(self, instance, owner):
+    if instance is None:
+      return self
+
+    table = self.dispatcher.cache
+    if self.dispatcher.param_index == 1:
+      def visit(node, *args, **kw):
+        result = table[node.__class__](instance, node, *args, **kw)
+        if result.__class__ is GeneratorType:
+          return trampoline(instance, table, result)
+        return result
+    else:
+      dispatcher = self.dispatcher
+      def visit(*args, **kw):
+        return dispatcher(instance, *args, **kw)
+
+    # se guarda en la instancia, las siguientes busquedas de `self.visit` no pasan por el descriptor
+    instance.__dict__[self.name] = visit
+    return visit
+
+
+# Runs a generator target to completion. Every value it yields is a request
+# to visit a node, either `child` or a tuple `(child, *args)`; the target of
+# the child is called and, if it is a generator too, it is pushed on the stack
+# instead of being run recursively. When a generator returns, its value is
+# sent to the one below it. Exceptions go the same way: they are thrown into
+# the parent generator, which may catch them as it would with a normal call.
+def trampoline(instance, table, gen):
+  stack = [gen]
+  value, error = None, None
+  while True:
+    try:
+      if error is None:
+        request = stack[-1].send(value)
+      else:
+        request, error = stack[-1].throw(error), None
+    except StopIteration as stop:
+      stack.pop()
+      if not stack:
+        return stop.value
+      value = stop.value
+      continue
+    except BaseException as exc:
+      stack.pop()
+      if not stack:
+        raise
+      value, error = None, exc
+      continue
+
+    if request.__class__ is tuple:
+      node, args = request[0], request[1:]
+    else:
+      node, args = request, ()
+
+    try:
+      value = table[node.__class__](instance, node, *args)
+    except BaseException as exc:
+      value, error = None, exc
+      continue
+
+    if value.__class__ is GeneratorType:
+      stack.append(value)
+      value = None
+
+
+class DispatchTable(dict):
+  def __init__(self, dispatcher):
+    super().__init__()
+    self.dispatcher = dispatcher
+
+  def __missing__(self, typ):
+    target = self[typ] = self.dispatcher.resolve(typ)
+    return target
+
+
 class Dispatcher(object):
   def __init__(self, param_name, fn):
     frame = inspect.currentframe().f_back.f_back
     top_level = frame.f_locals == frame.f_globals
     self.param_index = self.__argspec(fn).args.index(param_name)
     self.param_name = param_name
+    self.default = fn
     self.targets = {}
+    self.cache = DispatchTable(self)
 
   def __call__(self, *args, **kw):
-    typ = args[self.param_index].__class__
-    d = self.targets.get(typ)
-    if d is not None:
-      return d(*args, **kw)
-    else:
-      issub = issubclass
-      t = self.targets
-      ks = t.keys()
-      ans = [t[k](*args, **kw) for k in ks if issub(typ, k)]
-      if len(ans) == 1:
-        return ans.pop()
-      return ans
+    return self.cache[args[self.param_index].__class__](*args, **kw)
+
+  # The target for a class is the one registered for the first class in its
+  # __mro__ that has one. If another matching target is not a base of that
+  # one (only possible with multiple inheritance) the dispatch is ambiguous
+  # and a TypeError is raised instead of calling several targets. Classes
+  # without any matching target fall back to the function decorated with `on`.
+  def resolve(self, typ):
+    matches = [k for k in typ.__mro__ if k in self.targets]
+    if not matches:
+      return self.default
+
+    best = matches[0]
+    ambiguous = [k for k in matches[1:] if not issubclass(best, k)]
+    if ambiguous:
+      names = ', '.join(k.__name__ for k in [best] + ambiguous)
+      raise TypeError(f'Ambiguous dispatch for {typ.__name__} between {names}')
+
+    return self.targets[best]
 
   def add_target(self, typ, target):
     self.targets[typ] = target
+    self.cache.clear()
 
   @staticmethod
   def __argspec(fn):
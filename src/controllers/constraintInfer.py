@@ -0,0 +1,382 @@
+from .cmp import visitor, SelfType, AutoType, ErrorType, Scope, VariableInfo, DisjointSet
+from .parser import ProgramNode, ClassDeclarationNode, AttrDeclarationNode, FuncDeclarationNode, IfThenElseNode, WhileLoopNode, BlockNode, LetInNode, CaseOfNode, AssignNode, LessEqualNode, LessNode, EqualNode, ArithmeticNode, NotNode, IsVoidNode, ComplementNode, FunctionCallNode, MemberCallNode, NewNode, IntegerNode, IdNode, StringNode, BoolNode
+from .messages import INFERENCE, INFERENCE_ATTR, INFERENCE_PARAM, INFERENCE_RETURN, INFERENCE_VAR
+
+# una variable cuyo tipo hay que inferir (declarada AUTO_TYPE)
+def is_slot(var):
+    return isinstance(var, VariableInfo) and isinstance(var.type, AutoType) and not var.infered
+
+# cota en conflicto (tipos sin ancestro comun o sin uno mas especifico)
+CONFLICT = object()
+
+# Inferencia de AUTO_TYPE por restricciones. Una sola pasada por el AST (despues de TypeChecker,
+# con el mismo scope) asigna a cada expresion un termino: un tipo concreto o una variable AUTO_TYPE
+# (atributo, parametro, retorno o variable del let). Cuando un valor fluye a otro (asignacion,
+# inicializacion, argumento, cuerpo del metodo) se genera una restriccion source <= target:
+#   tipo <= variable:     cota inferior de la variable
+#   variable <= tipo:     cota superior (operandos aritmeticos, condiciones, parametros concretos, ...)
+#   variable <= variable: arista entre las dos
+# Las variables que tienen que ser iguales (el parametro dentro del metodo y el que ven los llamados)
+# se unen con union-find. Al resolver, las cotas inferiores se propagan hacia adelante por las aristas
+# con join y las superiores hacia atras quedandose con la mas especifica; cada valor solo puede subir
+# (o bajar) por la jerarquia, asi que el trabajo es casi lineal en la cantidad de restricciones.
+# Una variable toma su cota inferior si conforma a la superior, si no tiene inferior toma la superior.
+# Los llamados sobre un objeto cuyo tipo tambien se esta infiriendo no se resuelven.
+# Se usa igual que TypeInferer: `while inferer.visit(ast, scope): pass` hace una sola iteracion.
+class ConstraintInferer(visitor.Visitor):
+    def __init__(self, contxt, errors = [], inference: list = []):
+        self.current_type = None
+        self.current_method = None
+        self.context = contxt
+        self.errors = errors
+        self.inference = inference
+
+        self.object_type = self.context.get_type('Object')
+        self.string_type = self.context.get_type('String')
+        self.bool_type = self.context.get_type('Bool')
+        self.int_type = self.context.get_type('Int')
+
+        self.sets = DisjointSet()
+        self.lower = []
+        self.upper = []
+        self.edges = []
+        self.slots = []
+        self.attributes = set()
+
+    def term(self, var):
+        if is_slot(var):
+            return var
+        return self.current_type if isinstance(var.type, SelfType) else var.type
+
+    # el valor `source` fluye hacia `target`: source <= target
+    def flow(self, source, target):
+        source_slot, target_slot = is_slot(source), is_slot(target)
+        if source_slot and target_slot:
+            self.edges.append((source, target))
+        elif target_slot:
+            if self.bound(source):
+                self.lower.append((target, source))
+        elif source_slot:
+            if self.bound(target):
+                self.upper.append((source, target))
+
+    def bound(self, typex):
+        return typex is not None and not isinstance(typex, (AutoType, ErrorType, SelfType, VariableInfo))
+
+    def join(self, a, b):
+        if is_slot(a) or is_slot(b):
+            var = VariableInfo('<join>', AutoType())
+            self.flow(a, var)
+            self.flow(b, var)
+            return var
+        if a is None or b is None:
+            return a or b
+        return a.join_type(b) or ErrorType()
+
+    @staticmethod
+    def lub(a, b):
+        if a is None or a is b:
+            return b
+        if a is CONFLICT or b is CONFLICT:
+            return CONFLICT
+        return a.join_type(b) or CONFLICT
+
+    @staticmethod
+    def glb(a, b):
+        if a is None or a is b:
+            return b
+        if a is CONFLICT or b is CONFLICT:
+            return CONFLICT
+        if a.conforms_to(b):
+            return a
+        return b if b.conforms_to(a) else CONFLICT
+
+    # propaga las cotas de `bounds` por `edges` combinandolas con `combine` hasta que no cambien
+    @staticmethod
+    def propagate(bounds, edges, combine):
+        values = {}
+        for var, typex in bounds:
+            values[var] = combine(values.get(var), typex)
+
+        pending = list(values)
+        while pending:
+            var = pending.pop()
+            for other in edges.get(var, ()):
+                old = values.get(other)
+                new = combine(old, values[var])
+                if new is not old:
+                    values[other] = new
+                    pending.append(other)
+        return values
+
+    def solve(self):
+        find = self.sets.find
+        forward, backward = {}, {}
+        for source, target in self.edges:
+            source, target = find(source), find(target)
+            if source is not target:
+                forward.setdefault(source, []).append(target)
+                backward.setdefault(target, []).append(source)
+
+        lower = self.propagate([(find(var), typex) for var, typex in self.lower], forward, self.lub)
+        upper = self.propagate([(find(var), typex) for var, typex in self.upper], backward, self.glb)
+
+        # las variables sin ninguna cota toman la solucion de su componente conexa
+        groups = DisjointSet()
+        for source, target in self.edges:
+            groups.union(find(source), find(target))
+        group_lower, group_upper = {}, {}
+        for root, typex in lower.items():
+            group = groups.find(root)
+            group_lower[group] = self.lub(group_lower.get(group), typex)
+        for root, typex in upper.items():
+            group = groups.find(root)
+            group_upper[group] = self.glb(group_upper.get(group), typex)
+
+        solutions = {}
+        for root in groups.parents.keys() | lower.keys() | upper.keys():
+            low, high = lower.get(root), upper.get(root)
+            if low is None and high is None:
+                group = groups.find(root)
+                low, high = group_lower.get(group), group_upper.get(group)
+
+            if low is CONFLICT or high is CONFLICT:
+                continue
+            if low is None:
+                solutions[root] = high
+            elif high is None or low.conforms_to(high):
+                solutions[root] = low
+        return solutions
+
+    @visitor.on('node')
+    def visit(self, node, scope):
+        pass
+
+    @visitor.when(ProgramNode)
+    def visit(self, node: ProgramNode, scope: Scope):
+        for decl, childScope in zip(node.declarations, scope.children):
+            yield decl, childScope
+
+        solutions = self.solve()
+        for kind, var, *info in self.slots:
+            typex = solutions.get(self.sets.find(var))
+            if typex is None:
+                continue
+
+            var.type, var.infered = typex, True
+            if kind == 'attr':
+                ctype, attr, decl = info
+                attr.type = typex
+                self.inference.append(INFERENCE % (decl.line, decl.column) + INFERENCE_ATTR % (ctype.name, attr.name, typex.name))
+            elif kind == 'param':
+                ctype, method, i = info
+                method.param_types[i] = typex
+                method.param_infos[i].type, method.param_infos[i].infered = typex, True
+                self.inference.append(INFERENCE_PARAM % (method.name, ctype.name, method.param_names[i], typex.name))
+            elif kind == 'return':
+                ctype, method = info
+                method.return_type = typex
+                self.inference.append(INFERENCE_RETURN % (method.name, ctype.name, typex.name))
+            else:
+                idx, = info
+                self.inference.append(INFERENCE % (idx.line, idx.column) + INFERENCE_VAR % (idx.lex, typex.name))
+
+        # todo se resuelve en una pasada
+        return False
+
+    @visitor.when(ClassDeclarationNode)
+    def visit(self, node: ClassDeclarationNode, scope: Scope):
+        self.current_type = self.context.get_type(node.id.lex)
+
+        for feature, childScope in zip(node.features, scope.children):
+            yield feature, childScope
+
+    @visitor.when(AttrDeclarationNode)
+    def visit(self, node: AttrDeclarationNode, scope: Scope):
+        var = scope.lookup(node.id.lex)
+        attr = self.current_type.find_attribute(node.id.lex)
+        if var is None or attr is None:
+            return
+
+        if is_slot(var) and id(var) not in self.attributes:
+            self.attributes.add(id(var))
+            self.slots.append(('attr', var, self.current_type, attr, node))
+
+        if node.expression:
+            expr = yield node.expression, scope.children[0]
+            self.flow(expr, self.term(var))
+
+    @visitor.when(FuncDeclarationNode)
+    def visit(self, node: FuncDeclarationNode, scope: Scope):
+        self.current_method = method = self.current_type.get_method(node.id.lex)
+
+        for i, (var, info) in enumerate(zip(scope.locals[1:], method.param_infos)):
+            if is_slot(var):
+                self.slots.append(('param', var, self.current_type, method, i))
+                if is_slot(info):
+                    self.sets.union(var, info)
+
+        if is_slot(method.return_info):
+            self.slots.append(('return', method.return_info, self.current_type, method))
+            ret = self.term(method.return_info)
+        else:
+            ret = self.current_type if isinstance(method.return_type, SelfType) else method.return_type
+
+        body = yield node.body, scope.children[0]
+        self.flow(body, ret)
+
+    @visitor.when(IfThenElseNode)
+    def visit(self, node: IfThenElseNode, scope: Scope):
+        condition = yield node.condition, scope.children[0]
+        self.flow(condition, self.bool_type)
+
+        if_type = yield node.if_body, scope.children[1]
+        else_type = yield node.else_body, scope.children[2]
+        return self.join(if_type, else_type)
+
+    @visitor.when(WhileLoopNode)
+    def visit(self, node: WhileLoopNode, scope: Scope):
+        condition = yield node.condition, scope.children[0]
+        self.flow(condition, self.bool_type)
+
+        yield node.body, scope.children[1]
+        return self.object_type
+
+    @visitor.when(BlockNode)
+    def visit(self, node: BlockNode, scope: Scope):
+        result = None
+        for exp, child_scope in zip(node.expressions, scope.children):
+            result = yield exp, child_scope
+        return result
+
+    @visitor.when(LetInNode)
+    def visit(self, node: LetInNode, scope: Scope):
+        for (idx, typex, exp), child_scope, var in zip(node.let_body, scope.children[:-1], scope.locals):
+            if is_slot(var):
+                self.slots.append(('let', var, idx))
+            target = self.term(var)
+
+            if exp:
+                expr = yield exp, child_scope
+                self.flow(expr, target)
+
+        return (yield node.in_body, scope.children[-1])
+
+    @visitor.when(CaseOfNode)
+    def visit(self, node: CaseOfNode, scope: Scope):
+        yield node.expression, scope.children[0]
+
+        result = None
+        for (idx, typex, exp), child_scope in zip(node.branches, scope.children[1:]):
+            branch = yield exp, child_scope
+            result = self.join(result, branch) if result is not None else branch
+        return result
+
+    @visitor.when(AssignNode)
+    def visit(self, node: AssignNode, scope: Scope):
+        var = scope.lookup(node.id.lex)
+
+        expr = yield node.expression, scope.children[0]
+        if var is not None:
+            self.flow(expr, self.term(var))
+        return expr
+
+    @visitor.when(NotNode)
+    def visit(self, node: NotNode, scope: Scope):
+        expr = yield node.expression, scope.children[0]
+        self.flow(expr, self.bool_type)
+        return self.bool_type
+
+    @visitor.when(LessEqualNode)
+    def visit(self, node: LessEqualNode, scope: Scope):
+        left = yield node.left, scope.children[0]
+        right = yield node.right, scope.children[1]
+        self.flow(left, self.int_type)
+        self.flow(right, self.int_type)
+        return self.bool_type
+
+    @visitor.when(LessNode)
+    def visit(self, node: LessNode, scope: Scope):
+        left = yield node.left, scope.children[0]
+        right = yield node.right, scope.children[1]
+        self.flow(left, self.int_type)
+        self.flow(right, self.int_type)
+        return self.bool_type
+
+    @visitor.when(EqualNode)
+    def visit(self, node: EqualNode, scope: Scope):
+        yield node.left, scope.children[0]
+        yield node.right, scope.children[1]
+        return self.bool_type
+
+    @visitor.when(ArithmeticNode)
+    def visit(self, node: ArithmeticNode, scope: Scope):
+        left = yield node.left, scope.children[0]
+        right = yield node.right, scope.children[1]
+        self.flow(left, self.int_type)
+        self.flow(right, self.int_type)
+        return self.int_type
+
+    @visitor.when(IsVoidNode)
+    def visit(self, node: IsVoidNode, scope: Scope):
+        yield node.expression, scope.children[0]
+        return self.bool_type
+
+    @visitor.when(ComplementNode)
+    def visit(self, node: ComplementNode, scope: Scope):
+        expr = yield node.expression, scope.children[0]
+        self.flow(expr, self.int_type)
+        return self.int_type
+
+    # argumentos y retorno de un llamado a `name` sobre un objeto de tipo `obj_type`
+    def call(self, obj_type, name, args, scopes):
+        method = obj_type.find_method(name) if self.bound(obj_type) else None
+
+        if method is not None and len(args) == len(method.param_types):
+            for arg, info, child_scope in zip(args, method.param_infos, scopes):
+                expr = yield arg, child_scope
+                self.flow(expr, self.term(info))
+        else:
+            for arg, child_scope in zip(args, scopes):
+                yield arg, child_scope
+
+        if method is None:
+            return VariableInfo('<call>', AutoType()) if obj_type is None or is_slot(obj_type) else ErrorType()
+        if isinstance(method.return_type, SelfType):
+            return obj_type
+        return self.term(method.return_info) if is_slot(method.return_info) else method.return_type
+
+    @visitor.when(FunctionCallNode)
+    def visit(self, node: FunctionCallNode, scope: Scope):
+        obj_type = yield node.obj, scope.children[0]
+
+        if node.type:
+            dispatch = self.context.types.get(node.type.lex)
+            obj_type = dispatch if self.bound(dispatch) else ErrorType()
+
+        return (yield from self.call(obj_type, node.id.lex, node.args, scope.children[1:]))
+
+    @visitor.when(MemberCallNode)
+    def visit(self, node: MemberCallNode, scope: Scope):
+        return (yield from self.call(self.current_type, node.id.lex, node.args, scope.children))
+
+    @visitor.when(NewNode)
+    def visit(self, node: NewNode, scope: Scope):
+        return self.current_type if isinstance(node.static_type, SelfType) else node.static_type
+
+    @visitor.when(IntegerNode)
+    def visit(self, node: IntegerNode, scope: Scope):
+        return self.int_type
+
+    @visitor.when(StringNode)
+    def visit(self, node: StringNode, scope: Scope):
+        return self.string_type
+
+    @visitor.when(BoolNode)
+    def visit(self, node: BoolNode, scope: Scope):
+        return self.bool_type
+
+    @visitor.when(IdNode)
+    def visit(self, node: IdNode, scope: Scope):
+        var = scope.lookup(node.token.lex)
+        return self.term(var) if var is not None else ErrorType()
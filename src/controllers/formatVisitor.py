@@ -2,7 +2,7 @@ from .cmp import visitor, SemanticError, Attribute, Method, Type, SelfType, Auto
 from .parser import ProgramNode, ClassDeclarationNode, AttrDeclarationNode, FuncDeclarationNode, IfThenElseNode, WhileLoopNode, BlockNode, LetInNode, CaseOfNode, AssignNode, UnaryNode, BinaryNode, LessEqualNode, LessNode, EqualNode, ArithmeticNode, NotNode, IsVoidNode, ComplementNode, FunctionCallNode, MemberCallNode, NewNode, AtomicNode, IntegerNode, IdNode, StringNode, BoolNode
 
 
-class FormatVisitor:
+class FormatVisitor(visitor.Visitor):
     @visitor.on('node')
     def visit(self, node, tabs):
         pass
@@ -10,8 +10,10 @@ class FormatVisitor:
     @visitor.when(ProgramNode)
     def visit(self, node, tabs=0):
         ans = '\t' * tabs + f'\\__ProgramNode [<class> ... <class>]'
-        statements = '\n'.join(self.visit(child, tabs + 1)
-                               for child in node.declarations)
+        statements = []
+        for child in node.declarations:
+            statements.append((yield child, tabs + 1))
+        statements = '\n'.join(statements)
         return f'{ans}\n{statements}'
 
     @visitor.when(ClassDeclarationNode)
@@ -19,16 +21,17 @@ class FormatVisitor:
         parent = '' if node.parent is None else f"inherits {node.parent.lex}"
         ans = '\t' * tabs + \
             f'\\__ClassDeclarationNode: class {node.id.lex} {parent} {{ <feature> ... <feature> }}'
-        features = '\n'.join(self.visit(child, tabs + 1)
-                             for child in node.features)
+        features = []
+        for child in node.features:
+            features.append((yield child, tabs + 1))
+        features = '\n'.join(features)
         return f'{ans}\n{features}'
 
     @visitor.when(AttrDeclarationNode)
     def visit(self, node, tabs=0):
         ans = '\t' * tabs + f'\\__AttrDeclarationNode: {node.id.lex}: {node.type.lex}' + (
             ' <- <expr>' if node.expression else '') + ';'
-        expr = self.visit(node.expression, tabs +
-                          1) if node.expression else None
+        expr = (yield node.expression, tabs + 1) if node.expression else None
         return f'{ans}' + (f'\n{expr}' if expr else '')
 
     @visitor.when(FuncDeclarationNode)
@@ -37,29 +40,31 @@ class FormatVisitor:
                            for param in node.params)
         ans = '\t' * tabs + \
             f'\\__FuncDeclarationNode: {node.id.lex}({params}): {node.type.lex} {{ <expr> }}'
-        body = self.visit(node.body, tabs + 1)
+        body = yield node.body, tabs + 1
         return f'{ans}\n{body}'
 
     @visitor.when(IfThenElseNode)
     def visit(self, node, tabs=0):
         ans = '\t' * tabs + f'\\_IfThenElseNode: if <expr> then <expr> else <expr> fi'
-        cond = self.visit(node.condition, tabs + 1)
-        if_body = self.visit(node.if_body, tabs + 1)
-        else_body = self.visit(node.else_body, tabs + 1)
+        cond = yield node.condition, tabs + 1
+        if_body = yield node.if_body, tabs + 1
+        else_body = yield node.else_body, tabs + 1
         return f'{ans}\n{cond}\n{if_body}\n{else_body}'
 
     @visitor.when(WhileLoopNode)
     def visit(self, node, tabs=0):
         ans = '\t' * tabs + f'\\_WhileNode: while <expr> loop <expr> pool'
-        cond = self.visit(node.condition, tabs + 1)
-        body = self.visit(node.body, tabs + 1)
+        cond = yield node.condition, tabs + 1
+        body = yield node.body, tabs + 1
         return f'{ans}\n{cond}\n{body}'
 
     @visitor.when(BlockNode)
     def visit(self, node, tabs=0):
         ans = '\t' * tabs + f'\\_BlockNode: {{ <expr>; ... <expr>; }}'
-        expressions = '\n'.join(self.visit(expr, tabs + 1)
-                                for expr in node.expressions)
+        expressions = []
+        for expr in node.expressions:
+            expressions.append((yield expr, tabs + 1))
+        expressions = '\n'.join(expressions)
         return f'{ans}\n{expressions}'
 
     @visitor.when(LetInNode)
@@ -67,9 +72,12 @@ class FormatVisitor:
         let_body = ', '.join(f'{idx.lex}: {typex.lex}' + (' <- <expr>' if expr else '')
                              for idx, typex, expr in node.let_body)
         ans = '\t' * tabs + f'\\_LetInNode: let {let_body} in <expr>'
-        lets = '\n'.join(self.visit(expr, tabs + 1)
-                         for _, _, expr in node.let_body if expr)
-        body = self.visit(node.in_body, tabs + 1)
+        lets = []
+        for _, _, expr in node.let_body:
+            if expr:
+                lets.append((yield expr, tabs + 1))
+        lets = '\n'.join(lets)
+        body = yield node.in_body, tabs + 1
         return f'{ans}\n{lets}\n{body}'
 
     @visitor.when(CaseOfNode)
@@ -77,44 +85,52 @@ class FormatVisitor:
         case_body = ' '.join(
             f'{idx.lex}: {typex.lex} => <expr>;' for idx, typex, expr in node.branches)
         ans = '\t' * tabs + f'\\_CaseOfNode: case <expr> of {case_body} esac'
-        expression = self.visit(node.expression, tabs + 1)
-        body = '\n'.join(self.visit(expr, tabs + 1)
-                         for _, _, expr in node.branches)
+        expression = yield node.expression, tabs + 1
+        body = []
+        for _, _, expr in node.branches:
+            body.append((yield expr, tabs + 1))
+        body = '\n'.join(body)
         return f'{ans}\n{expression}\n{body}'
 
     @visitor.when(AssignNode)
     def visit(self, node, tabs=0):
         ans = '\t' * tabs + f'\\_AssingNode: {node.id.lex} <- <expr>'
-        expr = self.visit(node.expression, tabs + 1)
+        expr = yield node.expression, tabs + 1
         return f'{ans}\n{expr}'
 
     @visitor.when(UnaryNode)
     def visit(self, node, tabs=0):
         ans = '\t' * tabs + f'\\__{node.__class__.__name__} <expr>'
-        expression = self.visit(node.expression, tabs + 1)
+        expression = yield node.expression, tabs + 1
         return f'{ans}\n{expression}'
 
     @visitor.when(BinaryNode)
     def visit(self, node, tabs=0):
         ans = '\t' * tabs + f'\\__<expr> {node.__class__.__name__} <expr>'
-        left = self.visit(node.left, tabs + 1)
-        right = self.visit(node.right, tabs + 1)
+        left = yield node.left, tabs + 1
+        right = yield node.right, tabs + 1
         return f'{ans}\n{left}\n{right}'
 
     @visitor.when(FunctionCallNode)
     def visit(self, node, tabs=0):
-        obj = self.visit(node.obj, tabs + 1)
+        obj = yield node.obj, tabs + 1
         typex = f'@{node.type.lex}' if node.type else ''
         ans = '\t' * tabs + \
             f'\\__FunctionCallNode: <obj>{typex}.{node.id.lex}(<expr>, ..., <expr>)'
-        args = '\n'.join(self.visit(arg, tabs + 1) for arg in node.args)
+        args = []
+        for arg in node.args:
+            args.append((yield arg, tabs + 1))
+        args = '\n'.join(args)
         return f'{ans}\n{obj}\n{args}'
 
     @visitor.when(MemberCallNode)
     def visit(self, node, tabs=0):
         ans = '\t' * tabs + \
             f'\\__MemberCallNode: {node.id.lex}(<expr>, ..., <expr>)'
-        args = '\n'.join(self.visit(arg, tabs + 1) for arg in node.args)
+        args = []
+        for arg in node.args:
+            args.append((yield arg, tabs + 1))
+        args = '\n'.join(args)
         return f'{ans}\n{args}'
 
     @visitor.when(NewNode)
@@ -1,5 +1,6 @@
+import mmap
 import ply.lex as lex
-from .cmp import Token
+from .cmp import Token, TokenBuffer
 from .parser import CoolGrammar
 
 reservedKeywords = {
@@ -52,6 +53,9 @@ def t_INTEGER(t):
 
 def t_STRING(t):
     r'"[^\0\n"]*(\\\n[^\0\n"]*)*"'
+    # la columna se toma antes de avanzar de linea por los saltos que pueda tener el string
+    t.column = find_column(t.lexer, t)
+    track_newlines(t)
     t.value = t.value[1:-1]
     return t
 
@@ -64,18 +68,28 @@ def t_BOOL(t):
 
 def t_COMMENT(t):
     r'--[^\n]+\n|\(\*[^(\*\))]+\*\)'
-    pass
+    track_newlines(t)
 
 
 def t_newline(t):
     r'\n+'
     t.lexer.lineno += len(t.value)
+    t.lexer.linestart = t.lexpos + len(t.value)
 
 
-def find_column(input, token):
+# el lexer lleva la linea actual (lineno) y la posicion donde empieza (linestart),
+# toda regla que consuma saltos de linea tiene que actualizar ambas
+def track_newlines(t):
+    count = t.value.count('\n')
+    if count:
+        t.lexer.lineno += count
+        t.lexer.linestart = t.lexpos + t.value.rindex('\n') + 1
+
+
+def find_column(lexer, token):
     if token:
-        line_start = input.rfind('\n', 0, token.lexpos) + 1
-        return (token.lexpos - line_start) + 1
+        column = getattr(token, 'column', None)
+        return column if column is not None else (token.lexpos - lexer.linestart) + 1
 
 def t_NOT(t):
     r'[nN][oO][tT]'
@@ -100,29 +114,97 @@ t_ACTION = r'=>'
 
 def t_error(t):
     print("Illegal character '{}'".format(t.value[0]))
+    t.lexer.errors += 1
     t.lexer.skip(1)
 
 
 t_ignore = ''.join(ignored)
 
+# el lexer se construye una sola vez (introspeccion de las reglas t_* y compilacion de la expresion regular),
+# cada llamada a tokenizer trabaja sobre un clone con su propio estado
+_lexer = lex.lex()
+_lexer.linestart = 0
+_lexer.errors = 0
+
+# genera los tokens a medida que se piden, el parser solo necesita uno de lookahead.
+# `code` puede ser el texto del programa o un archivo abierto
+def iter_tokens(code):
+    if not isinstance(code, str):
+        code = code.read()
+
+    lexer = _lexer.clone()
+
+    lexer.input(code)
+
+    while True:
+        token = lexer.token()
+        if token is None:
+            break
+        yield Token(token.value, tokens_dict[token.type], token.lineno, find_column(lexer, token))
+
+    yield Token('$', CoolGrammar.EOF)
+
+# como iter_tokens pero desde `position`, que tiene que ser el inicio de un token en la linea `line`
+# (que empieza en `linestart`). Junto a cada token da donde empieza y termina en el texto y cuantos
+# caracteres ilegales se saltaron antes de el
+def iter_positions(code, position=0, line=1, linestart=0):
+    lexer = _lexer.clone()
+    lexer.input(code)
+    lexer.lexpos, lexer.lineno, lexer.linestart = position, line, linestart
+
+    while True:
+        token = lexer.token()
+        if token is None:
+            break
+        yield Token(token.value, tokens_dict[token.type], token.lineno, find_column(lexer, token)), token.lexpos, lexer.lexpos, lexer.errors
+
+    yield Token('$', CoolGrammar.EOF), len(code), len(code), lexer.errors
+
 def tokenizer(code):
-    # lex.lex(optimize=1) compress code and file
-    lexer = lex.lex()
+    return list(iter_tokens(code))
+
+# valor del token a partir del lexema (lo mismo que hacen las reglas t_INTEGER, t_STRING y t_BOOL)
+token_values = {
+    tokens_dict['INTEGER'].Index: int,
+    tokens_dict['STRING'].Index: lambda lex: lex[1:-1],
+    tokens_dict['BOOL'].Index: lambda lex: lex == 'true',
+    CoolGrammar.EOF.Index: lambda lex: '$',
+}
 
+# version compacta de tokenizer: guarda los tokens en un TokenBuffer (arreglos paralelos)
+# en lugar de un objeto Token por lexema
+def tokenize_buffer(code):
+    if not isinstance(code, str):
+        code = code.read()
+
+    lexer = _lexer.clone()
     lexer.input(code)
 
-    tokens = []
+    tokens = TokenBuffer(code, [CoolGrammar.EOF] + CoolGrammar.terminals, token_values)
 
     while True:
         token = lexer.token()
         if token is None:
             break
-        tokens.append(Token(token.value, tokens_dict[token.type], token.lineno, find_column(code, token)))
+        tokens.append(tokens_dict[token.type].Index, token.lexpos, lexer.lexpos, token.lineno, find_column(lexer, token))
 
-    tokens.append(Token('$', CoolGrammar.EOF))
+    tokens.append(CoolGrammar.EOF.Index, len(code), len(code))
 
     return tokens
 
+# lee el programa mapeando el archivo en memoria: el texto se decodifica directo del buffer
+# mapeado, sin la copia intermedia en bytes de file.read() (ply necesita un str para sus expresiones)
+def read_source(path):
+    with open(path, 'rb') as file:
+        try:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # no se pueden mapear archivos vacios
+            return ''
+
+        with data:
+            return str(data, 'utf-8')
+
 # if __name__ == '__main__':
 
 #     from pathlib import Path
@@ -133,7 +215,7 @@ def tokenizer(code):
 #         lexer.input(readed)
 #         while True:
 #             token = lexer.token()
-#             col = find_column(readed, token)
+#             col = find_column(lexer, token)
 #             if token is None:
 #                 break
 #             print(token.value, token.lineno, col)
@@ -0,0 +1,119 @@
+import threading
+from collections import OrderedDict
+
+from .checkSession import CheckSession
+from .pipeline import analyze, _payload, cache
+
+# Chequeo en vivo para la interfaz: cada cliente (una pagina abierta) tiene su sesion y a lo sumo
+# un analisis corriendo. Si manda otro programa mientras tanto, el que corre deja de mandar
+# resultados despues de la fase en que va y se analiza el ultimo programa recibido (los del medio
+# se descartan). Cada fase se manda apenas termina con el numero de pedido (generation) para que
+# la pagina ignore lo que llega de pedidos viejos. Un programa que esta en el cache de resultados se
+# responde con la fase de inferencia directamente.
+#
+# `send(client, generation, phase, result)` recibe cada fase, `spawn(function, *args)` arranca una
+# tarea concurrente y `run(function, *args)` corre un paso del analisis fuera del loop de la
+# interfaz y retorna su resultado. Por defecto las tareas son hilos y los pasos corren en ellos.
+#
+# Cada pagina que se recarga es un cliente nuevo, asi que se guardan a lo sumo `size` clientes: al
+# pasarse se olvidan los que mandaron algo hace mas tiempo y no tienen un analisis corriendo.
+#
+# La sesion infiere con TypeInferer: con otro `inferer` (una llave de INFERERS) el programa se
+# analiza completo en un solo paso y solo se manda la fase de inferencia.
+
+def _thread(function, *args):
+    threading.Thread(target=function, args=args, daemon=True).start()
+
+def _call(function, *args):
+    return function(*args)
+
+# las fases de parse y check llegan como handler sin inference, la de inferencia igual que handler
+def format_phase(phase, result):
+    if phase == 'tokens':
+        return result
+    return _payload(result['errors'], result.get('inference'))
+
+
+class _Client:
+    def __init__(self):
+        self.session = CheckSession()
+        self.generation = 0
+        self.code = None            # ultimo programa recibido que no se empezo a analizar
+        self.running = False
+
+
+class LiveChecker:
+    def __init__(self, send, spawn=_thread, run=_call, size=8, inferer='fixpoint'):
+        self.send = send
+        self.spawn = spawn
+        self.run = run
+        self.size = size
+        self.inferer = inferer
+        self.clients = OrderedDict()
+        self.lock = threading.Lock()
+
+    # recibe un programa de `client` y retorna su numero de pedido
+    def submit(self, client, code):
+        with self.lock:
+            state = self.clients.get(client)
+            if state is None:
+                self._forget(self.size - 1)
+                state = self.clients[client] = _Client()
+            self.clients.move_to_end(client)
+            state.generation += 1
+            state.code = code
+            generation = state.generation
+            if state.running:
+                return generation
+            state.running = True
+
+        self.spawn(self._work, client, state)
+        return generation
+
+    # deja a lo sumo `keep` clientes, los que corren se quedan aunque sobren (se olvidan en un submit posterior)
+    def _forget(self, keep):
+        extra = len(self.clients) - keep
+        for client in [client for client, state in self.clients.items() if not state.running][:max(0, extra)]:
+            del self.clients[client]
+
+    def _work(self, client, state):
+        while True:
+            with self.lock:
+                code, generation = state.code, state.generation
+                state.code = None
+                if code is None:
+                    state.running = False
+                    return
+
+            key = cache.key(code, self.inferer)
+            cached = cache.get(key)
+            if cached is not None:
+                self.send(client, generation, 'inference', _payload(*cached))
+                continue
+
+            if self.inferer != 'fixpoint':
+                try:
+                    result = self.run(analyze, code, self.inferer)
+                except Exception as ex:
+                    self.send(client, generation, 'exception', {'errors': f'Errors:\n{type(ex).__name__}: {ex}'})
+                    continue
+                cache.put(key, *result)
+                if state.generation == generation:
+                    self.send(client, generation, 'inference', _payload(*result))
+                continue
+
+            phases = state.session.phases(code)
+            try:
+                while True:
+                    item = self.run(next, phases, None)
+                    if item is None:
+                        cache.put(key, result['errors'], result.get('inference'))
+                        break
+                    if state.generation != generation:
+                        # hay un pedido mas nuevo, el resto de este no se manda
+                        self.run(phases.close)
+                        break
+                    phase, result = item
+                    self.send(client, generation, phase, format_phase(phase, result))
+            except Exception as ex:
+                self.send(client, generation, 'exception', {'errors': f'Errors:\n{type(ex).__name__}: {ex}'})
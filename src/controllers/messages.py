@@ -11,3 +11,4 @@ INFERENCE_ATTR = 'In class "%s", attribute "%s": type "%s". '
 INFERENCE_PARAM = 'In method "%s" in class "%s", param "%s": type "%s". '
 INFERENCE_RETURN = 'Return of method "%s" in class "%s", type "%s". '
 INFERENCE_VAR = 'Varible "%s": type "%s". '
+PARSE_ERROR = 'Parse Error: Unexpected token "%s" in line "%s" and column "%s". Suggestion: check ";" in end of class and methods.'
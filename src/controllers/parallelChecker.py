@@ -0,0 +1,165 @@
+import gc
+import io
+import pickle
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from .cmp import Scope, Symbol, ErrorType
+from .parser import CoolGrammar, ProgramNode, FuncDeclarationNode
+from .astclass import iter_nodes
+from .typeChecker import TypeChecker
+
+# Chequeo de tipos repartiendo las clases entre varios procesos.
+#
+# Despues de TypeBuilder el chequeo de una clase solo lee el contexto y escribe en su
+# propio scope, su lista de errores y el static_type de sus nodos. Cada proceso recibe
+# el contexto y el AST una sola vez, al arrancar, y despues solo el indice de la clase
+# a chequear. Devuelve los errores, los static_type de los nodos de la clase en preorden
+# y su scope aplanado, con nombres de tipos en vez de los tipos. Los resultados se unen
+# en el orden de las clases, asi la salida es la misma del chequeo secuencial.
+
+# los simbolos de la gramatica (token_type de los tokens) viajan por nombre, las
+# producciones tienen lambdas y no se pueden serializar
+class _Pickler(pickle.Pickler):
+    def persistent_id(self, obj):
+        return obj.Name if isinstance(obj, Symbol) else None
+
+class _Unpickler(pickle.Unpickler):
+    def persistent_load(self, name):
+        return CoolGrammar[name]
+
+
+# estado de cada proceso del pool
+_context = None
+_program = None
+
+def _start_worker(context, program):
+    global _context, _program
+    _context, _program = context, program
+
+def _load_worker(data):
+    _start_worker(*_Unpickler(io.BytesIO(data)).load())
+
+def _find_method(context, method):
+    return None if method is None else context.get_type(method[0]).get_method(method[1])
+
+def _type_name(typex):
+    return None if typex is None else typex.name
+
+# el scope en preorden: la posicion del padre y el index de cada scope, y las variables
+# de los que tienen alguna (la mayoria de los scopes de expresiones estan vacios)
+def _flatten(scope):
+    parents, indices, variables = [], [], {}
+    stack = [(scope, -1)]
+    while stack:
+        scope, parent = stack.pop()
+        position = len(parents)
+        parents.append(parent)
+        indices.append(scope.index)
+        if scope.locals:
+            variables[position] = [(var.name, _type_name(var.type)) for var in scope.locals]
+        stack.extend([(child, position) for child in reversed(scope.children)])
+    return parents, indices, variables
+
+def _check_class(index, method):
+    node = _program.declarations[index]
+
+    errors = []
+    checker = TypeChecker(_context, errors)
+    checker.current_method = _find_method(_context, method)
+    scope = Scope().create_child()
+    checker.visit(node, scope)
+
+    types = [_type_name(getattr(n, 'static_type', None)) for n in iter_nodes(node)]
+    return errors, types, _flatten(scope)
+
+
+class ParallelTypeChecker:
+    def __init__(self, context, errors=[], workers=None):
+        self.context = context
+        self.errors = errors
+        self.workers = workers
+
+    def visit(self, node):
+        assert isinstance(node, ProgramNode)
+        declarations = node.declarations
+
+        # con herencia ciclica el chequeo de una clase cambia el padre de su tipo y eso lo
+        # ven las clases siguientes, en ese caso (o si no hay nada que repartir) se chequea en orden
+        object_type = self.context.get_type('Object')
+        types = [self.context.types.get(declaration.id.lex) for declaration in declarations]
+        if len(declarations) < 2 or not all(typex is not None and typex.indexed_with(object_type) for typex in types):
+            return TypeChecker(self.context, self.errors).visit(node)
+
+        pool = self._pool(node)
+        if pool is None:
+            return TypeChecker(self.context, self.errors).visit(node)
+
+        # el chequeo secuencial arrastra current_method de la clase anterior (su ultimo metodo)
+        methods, method = [], None
+        for declaration in declarations:
+            methods.append(method)
+            for feature in declaration.features:
+                if isinstance(feature, FuncDeclarationNode):
+                    method = (declaration.id.lex, feature.id.lex)
+
+        scope = Scope()
+        # la union crea un scope por nodo y todos quedan vivos, con el recolector activo se
+        # recorreria el AST completo cada tantas creaciones sin liberar nada
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            with pool:
+                futures = [pool.submit(_check_class, index, method) for index, method in enumerate(methods)]
+                for declaration, future in zip(declarations, futures):
+                    errors, static_types, flat = future.result()
+                    self.errors.extend(errors)
+                    for n, name in zip(iter_nodes(declaration), static_types):
+                        if name is not None:
+                            n.static_type = self._type(name)
+                    self._unflatten(scope, flat)
+        finally:
+            if collecting:
+                gc.enable()
+
+        return scope
+
+    # con fork los procesos heredan el contexto y el AST ya construidos, si no se
+    # serializan una vez para todos (None si el arbol es demasiado profundo para pickle).
+    # None tambien dentro de un proceso de multiprocessing.Pool, que no puede tener hijos
+    def _pool(self, node):
+        if multiprocessing.current_process().daemon:
+            return None
+
+        # con otros hilos corriendo (el pool de hilos de gevent en la interfaz, los del servidor) el
+        # hijo de un fork puede heredar un lock tomado por otro hilo, ahi se arrancan con spawn
+        alone = threading.current_thread() is threading.main_thread() and threading.active_count() == 1
+        if alone and 'fork' in multiprocessing.get_all_start_methods():
+            return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('fork'), initializer=_start_worker, initargs=(self.context, node))
+
+        file = io.BytesIO()
+        try:
+            _Pickler(file, pickle.HIGHEST_PROTOCOL).dump((self.context, node))
+        except RecursionError:
+            return None
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'), initializer=_load_worker, initargs=(file.getvalue(),))
+
+    def _type(self, name):
+        typex = self.context.types.get(name)
+        return ErrorType() if typex is None else typex
+
+    def _unflatten(self, root, flat):
+        parents, indices, variables = flat
+        scopes = []
+        for parent, index in zip(parents, indices):
+            parent = root if parent < 0 else scopes[parent]
+            scope = Scope(parent)
+            scope.index = index
+            parent.children.append(scope)
+            scopes.append(scope)
+
+        for position, local in variables.items():
+            scope = scopes[position]
+            for vname, tname in local:
+                scope.define_variable(vname, None if tname is None else self._type(tname))
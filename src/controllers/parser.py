@@ -1,6 +1,11 @@
-from .cmp import Grammar, LR1Parser
+import os
+
+from .cmp import Grammar, LALR1Parser
 from .astclass import *
 
+# tablas LALR(1) serializadas, se regeneran solas si la gramatica cambia
+PARSETAB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'parsetab.pickle')
+
 # grammar
 CoolGrammar = Grammar()
 
@@ -17,15 +22,21 @@ plus, minus, star, div, isvoid, compl = CoolGrammar.Terminals('+ - * / isvoid ~'
 semi, colon, comma, dot, at, opar, cpar, ocur, ccur, larrow, rarrow = CoolGrammar.Terminals('; : , . @ ( ) { } <- =>')
 notx, less, leq, equal = CoolGrammar.Terminals('not < <= =')
 
+# las listas usan recursion izquierda y se construyen agregando al final,
+# asi cada reduccion es O(1) en vez de copiar la lista completa
+def _append(items, item):
+    items.append(item)
+    return items
+
 # productions
 program %= class_list, lambda h, s: ProgramNode(s[1])
-class_list %= def_class + class_list, lambda h, s: [s[1]] + s[2]
+class_list %= class_list + def_class, lambda h, s: _append(s[1], s[2])
 class_list %= def_class, lambda h, s: [s[1]]
 def_class %= classx + typex + ocur + feature_list + ccur + \
     semi, lambda h, s: ClassDeclarationNode(s[2], s[4])
 def_class %= classx + typex + inherits + typex + ocur + feature_list + \
     ccur + semi, lambda h, s: ClassDeclarationNode(s[2], s[6], s[4])
-feature_list %= feature + feature_list, lambda h, s: [s[1]] + s[2]
+feature_list %= feature_list + feature, lambda h, s: _append(s[1], s[2])
 feature_list %= CoolGrammar.Epsilon, lambda h, s: []
 feature %= idx + colon + typex + \
     semi, lambda h, s: AttrDeclarationNode(s[1], s[3])
@@ -36,7 +47,7 @@ feature %= idx + opar + param_list + cpar + colon + typex + ocur + expr + \
 feature %= idx + opar + cpar + colon + typex + ocur + expr + ccur + \
     semi, lambda h, s: FuncDeclarationNode(s[1], [], s[5], s[7])
 param_list %= param, lambda h, s: [s[1]]
-param_list %= param + comma + param_list, lambda h, s: [s[1]] + s[3]
+param_list %= param_list + comma + param, lambda h, s: _append(s[1], s[3])
 param %= idx + colon + typex, lambda h, s: (s[1], s[3])
 expr %= ifx + expr + then + expr + elsex + expr + \
     fi, lambda h, s: IfThenElseNode(s[2], s[4], s[6])
@@ -49,18 +60,18 @@ expr %= case + expr + of + case_list + \
 expr %= idx + larrow + expr, lambda h, s: AssignNode(s[1], s[3])
 expr %= truth_expr, lambda h, s: s[1]
 expr_list %= expr + semi, lambda h, s: [s[1]]
-expr_list %= expr + semi + expr_list, lambda h, s: [s[1]] + s[3]
+expr_list %= expr_list + expr + semi, lambda h, s: _append(s[1], s[2])
 let_list %= idx + colon + typex, lambda h, s: [(s[1], s[3], None)]
 let_list %= idx + colon + typex + larrow + \
     expr, lambda h, s: [(s[1], s[3], s[5])]
-let_list %= idx + colon + typex + comma + \
-    let_list, lambda h, s: [(s[1], s[3], None)] + s[5]
-let_list %= idx + colon + typex + larrow + expr + comma + \
-    let_list, lambda h, s: [(s[1], s[3], s[5])] + s[7]
+let_list %= let_list + comma + idx + colon + \
+    typex, lambda h, s: _append(s[1], (s[3], s[5], None))
+let_list %= let_list + comma + idx + colon + typex + larrow + \
+    expr, lambda h, s: _append(s[1], (s[3], s[5], s[7]))
 case_list %= idx + colon + typex + rarrow + \
     expr + semi, lambda h, s: [(s[1], s[3], s[5])]
-case_list %= idx + colon + typex + rarrow + expr + semi + \
-    case_list, lambda h, s: [(s[1], s[3], s[5])] + s[7]
+case_list %= case_list + idx + colon + typex + rarrow + expr + \
+    semi, lambda h, s: _append(s[1], (s[2], s[4], s[6]))
 truth_expr %= notx + truth_expr, lambda h, s: NotNode(s[2])
 truth_expr %= comp_expr, lambda h, s: s[1]
 comp_expr %= comp_expr + leq + arith, lambda h, s: LessEqualNode(s[1], s[3])
@@ -89,7 +100,7 @@ func_call %= at + typex + dot + idx + opar + \
 func_call %= at + typex + dot + idx + \
     opar + cpar, lambda h, s: (s[4], [], s[2])
 arg_list %= expr, lambda h, s: [s[1]]
-arg_list %= expr + comma + arg_list, lambda h, s: [s[1]] + s[3]
+arg_list %= arg_list + comma + expr, lambda h, s: _append(s[1], s[3])
 atom %= member_call, lambda h, s: s[1]
 atom %= new + typex, lambda h, s: NewNode(s[2])
 atom %= opar + expr + cpar, lambda h, s: s[2]
@@ -98,4 +109,4 @@ atom %= integer, lambda h, s: IntegerNode(s[1])
 atom %= string, lambda h, s: StringNode(s[1])
 atom %= boolx, lambda h, s: BoolNode(s[1])
 
-CoolParser = LR1Parser(CoolGrammar)
\ No newline at end of file
+CoolParser = LALR1Parser(CoolGrammar, cache=PARSETAB)
\ No newline at end of file
@@ -0,0 +1,139 @@
+from .lexer import iter_tokens, read_source
+from .parser import CoolParser
+from .typeCollector import TypeCollector
+from .typeBuilder import TypeBuilder
+from .typeChecker import TypeChecker
+from .parallelChecker import ParallelTypeChecker
+from .typeInfer import TypeInferer
+from .constraintInfer import ConstraintInferer
+from .messages import PARSE_ERROR
+from .checkSession import CheckSession
+from .resultCache import ResultCache, ASTCache
+
+# motores de inferencia disponibles para analyze
+INFERERS = {
+    'fixpoint': TypeInferer,
+    'constraints': ConstraintInferer,
+}
+
+def _tokenizer(code):
+    comment = "================== TOKENS ====================="
+
+    # los tokens se generan a medida que el parser los consume
+    return (comment, iter_tokens(code))
+
+def _parse(tokens, errors = []):
+    comment = '=================== PARSE ====================='
+
+    # el AST se construye durante el parsing, si hay error se obtiene el token donde fallo
+    ast, ok = CoolParser(tokens, evaluate=True)
+
+    if not ok:
+        errors.append(PARSE_ERROR % (ast.lex, ast.line, ast.column))
+        return (comment, None)
+    
+    return (comment, ast)
+
+def _collectingTypes(ast, errors = []):
+    comment = '============== COLLECTING TYPES ==============='
+
+    collector = TypeCollector(errors)
+    collector.visit(ast)
+    context = collector.context
+
+    return (comment, context)
+
+def _buildingTypes(context, ast, errors = []):
+    comment = "=============== BUILDING TYPES =================="
+    builder = TypeBuilder(context, errors)
+    builder.visit(ast)
+
+    return comment
+
+def _checkingTypes(context, ast, errors = [], workers = None):
+    comment =  '============== CHECKING TYPES ===================='
+    checker = TypeChecker(context, errors) if workers is None else ParallelTypeChecker(context, errors, workers)
+    scope = checker.visit(ast)
+
+    return (comment, scope)
+
+def _infererTypes(context, ast, scope, errors: list = [], inference: list = [], engine = TypeInferer):
+    comment = '============== INFERINING TYPES ==============='
+    inferer = engine(context, errors, inference)
+    while inferer.visit(ast, scope): pass
+
+    return comment
+
+# con un cache en disco (python . --cache) los AST parseados se guardan ahi para las proximas ejecuciones
+parsed = ASTCache.from_environment(64)
+
+# corre todas las fases sobre `code` (texto o archivo abierto) y retorna (errors, inference),
+# inference es None si hubo errores de parsing. `inferer` es una de las llaves de INFERERS,
+# con `workers` el chequeo de tipos reparte las clases entre esa cantidad de procesos
+def analyze(code, inferer = 'fixpoint', workers = None):
+    errors: list = []
+
+    ast = key = None
+    if parsed.path is not None:
+        if not isinstance(code, str):
+            code = code.read()
+        key = parsed.key(code, 'ast')
+        ast = parsed.get(key)
+
+    if ast is None:
+        comment_tokenizer, tokens = _tokenizer(code)
+        comment_parser, ast = _parse(tokens, errors)
+
+        if len(errors):
+            return errors, None
+        if key is not None:
+            parsed.put(key, ast)
+
+    comment_collecting, context = _collectingTypes(ast, errors)
+    comment_building = _buildingTypes(context, ast, errors)
+    comment_checking, scope = _checkingTypes(context, ast, errors, workers)
+
+    inference: list = []
+    
+    comment_inferer  = _infererTypes(context, ast, scope, errors, inference, INFERERS[inferer])
+
+    return errors, inference
+
+def _payload(errors, inference):
+    if inference is None:
+        return {
+            'errors': 'Errors:\n' + '.\n'.join(e for e in errors),
+        }
+
+    # 'context': 'Context:\n' + context.__str__(),
+    return {
+        'errors': 'Errors:\n' + '.\n'.join(e for e in errors),
+        'inference': 'Inference:\n' + '.\n'.join(i for i in inference)
+    }
+
+# la interfaz manda el programa completo en cada cambio, la sesion solo rehace las clases afectadas
+_session = CheckSession()
+
+# resultados de los programas ya analizados, un programa repetido no se vuelve a analizar
+cache = ResultCache.from_environment()
+
+# la sesion infiere con TypeInferer, con otro motor el programa se analiza completo
+def handler(code: str, inferer = 'fixpoint'):
+    if not isinstance(code, str):
+        code = code.read()
+    key = cache.key(code, inferer)
+    result = cache.get(key)
+    if result is None:
+        result = _session.update(code) if inferer == 'fixpoint' else analyze(code, inferer)
+        cache.put(key, *result)
+    return _payload(*result)
+
+# igual que handler pero leyendo el programa de un archivo (mapeado en memoria), sin pasar el texto por la interfaz
+def handler_file(path, inferer = 'fixpoint', workers = None):
+    code = read_source(path)
+    key = cache.key(code, inferer)
+    result = cache.get(key)
+    if result is None:
+        result = analyze(code, inferer, workers)
+        cache.put(key, *result)
+    return _payload(*result)
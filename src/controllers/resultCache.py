@@ -0,0 +1,230 @@
+import os
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+
+from . import astFormat
+
+# Cache de resultados de programas completos: la llave es el hash del texto (y del motor de
+# inferencia) y el valor el (errors, inference) final, asi un programa que ya se analizo no se
+# vuelve a analizar. Los ultimos `size` resultados usados quedan en memoria. Con `path` tambien se
+# guardan en esa carpeta, un archivo por resultado, y cuando la carpeta pasa de `disk_size` bytes se
+# borran los archivos usados hace mas tiempo. Lo guardado en disco lleva la version del codigo del
+# analisis: si cambia algun modulo de controllers no se usa.
+
+# variables de entorno con la carpeta y el tamaño en MB del cache en disco (python . --cache),
+# asi lo ven tambien los procesos de los pools
+CACHE_DIR = 'COOL_CACHE'
+CACHE_SIZE = 'COOL_CACHE_SIZE'
+
+# terminaciones de los archivos de los caches que comparten una carpeta (ResultCache y ASTCache):
+# `disk_size` es para todos juntos, asi la carpeta no pasa de ese tamaño
+_SUFFIXES = ('.pickle', '.ast')
+
+# bytes en disco de cada carpeta, compartidos por los caches del proceso que la usan
+_disk_used = {}
+_disk_lock = threading.Lock()
+
+def _code_version():
+    root = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for folder in (root, os.path.join(root, 'cmp')):
+        for name in sorted(os.listdir(folder)):
+            if name.endswith('.py'):
+                with open(os.path.join(folder, name), 'rb') as file:
+                    digest.update(name.encode('utf-8') + b'\0' + file.read())
+    return digest.hexdigest()
+
+def _copy(result):
+    errors, inference = result
+    return list(errors), None if inference is None else list(inference)
+
+
+class ResultCache:
+    SUFFIX = '.pickle'
+
+    def __init__(self, size=256, path=None, disk_size=64 * 1024 * 1024):
+        self.size = size
+        self.path = path
+        self.disk_size = disk_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.disk_hits = self.misses = self.evictions = self.disk_evictions = 0
+        self.version = None
+
+    @classmethod
+    def from_environment(cls, size=256):
+        disk_size = os.environ.get(CACHE_SIZE)
+        if disk_size:
+            return cls(size, os.environ.get(CACHE_DIR) or None, int(float(disk_size) * 1024 * 1024))
+        return cls(size, os.environ.get(CACHE_DIR) or None)
+
+    @staticmethod
+    def key(code, inferer='fixpoint'):
+        return hashlib.sha256(f'{inferer}\0{code}'.encode('utf-8', 'surrogatepass')).hexdigest()
+
+    # (errors, inference) guardado con `key` (una copia), None si no esta
+    def get(self, key):
+        result = self._lookup(key)
+        return None if result is None else _copy(result)
+
+    def put(self, key, errors, inference):
+        self._store(key, _copy((errors, inference)))
+
+    def stats(self):
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'entries': len(self.entries),
+                'evictions': self.evictions,
+                'disk_evictions': self.disk_evictions,
+                'disk_bytes': _disk_used.get(self.path),
+            }
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def _lookup(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+        value = self._load(key) if self.path is not None else None
+        with self.lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, value)
+        return value
+
+    def _store(self, key, value):
+        with self.lock:
+            self._remember(key, value)
+        if self.path is not None:
+            self._save(key, value)
+
+    # version de lo guardado en disco, lo de otra version no se usa
+    def _version(self):
+        return _code_version()
+
+    def _remember(self, key, result):
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def _file(self, key):
+        return os.path.join(self.path, key[:2], key[2:] + self.SUFFIX)
+
+    def _load(self, key):
+        file_path = self._file(key)
+        try:
+            with open(file_path, 'rb') as file:
+                data = pickle.load(file)
+            # la fecha de uso del archivo decide que se borra primero
+            os.utime(file_path)
+        except Exception:
+            return None
+
+        if self.version is None:
+            self.version = self._version()
+        if not isinstance(data, dict) or data.get('version') != self.version:
+            return None
+        return data['result']
+
+    def _save(self, key, value):
+        if self.version is None:
+            self.version = self._version()
+        file_path = self._file(key)
+
+        # se escribe en un temporal y luego se renombra, asi varios procesos pueden compartir la carpeta
+        temp = f'{file_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(temp, 'wb') as file:
+                pickle.dump({'version': self.version, 'result': value}, file, pickle.HIGHEST_PROTOCOL)
+            size = os.path.getsize(temp)
+            os.replace(temp, file_path)
+        except OSError:
+            try:
+                os.remove(temp)
+            except OSError:
+                pass
+            return
+
+        # los bytes se cuentan al primer uso de la carpeta y despues se suman los guardados
+        total = self._scan()[0] if self.path not in _disk_used else None
+        with _disk_lock:
+            if total is not None:
+                _disk_used[self.path] = total
+            else:
+                _disk_used[self.path] += size
+            full = _disk_used[self.path] > self.disk_size
+        if full:
+            self._evict()
+
+    # total de bytes de la carpeta y sus archivos de cache (de todos los caches) como (fecha de uso, tamaño, ruta)
+    def _scan(self):
+        files, total = [], 0
+        for root, _, names in os.walk(self.path):
+            for name in names:
+                if not name.endswith(_SUFFIXES):
+                    continue
+                file_path = os.path.join(root, name)
+                try:
+                    info = os.stat(file_path)
+                except OSError:
+                    continue
+                files.append((info.st_mtime, info.st_size, file_path))
+                total += info.st_size
+        return total, files
+
+    # borra los archivos usados hace mas tiempo, de este cache o de otro, hasta quedar en 3/4 de disk_size
+    def _evict(self):
+        total, files = self._scan()
+        files.sort()
+        limit = self.disk_size * 3 // 4
+        for _, size, file_path in files:
+            if total <= limit:
+                break
+            try:
+                os.remove(file_path)
+            except OSError:
+                continue
+            total -= size
+            with self.lock:
+                self.disk_evictions += 1
+        with _disk_lock:
+            _disk_used[self.path] = total
+
+
+# Cache de los AST recien parseados en el formato de astFormat, con la llave key(code, 'ast'): un
+# programa que ya se parseo (aunque el analisis haya cambiado) no se vuelve a lexear ni parsear.
+# Comparte la carpeta y el tamaño en disco con ResultCache: un AST puede borrar un resultado viejo y al reves.
+class ASTCache(ResultCache):
+    SUFFIX = '.ast'
+
+    # el AST guardado con `key` (uno nuevo cada vez), None si no esta
+    def get(self, key):
+        data = self._lookup(key)
+        if data is None:
+            return None
+        try:
+            return astFormat.loads(data)
+        except ValueError:
+            return None
+
+    def put(self, key, ast):
+        self._store(key, astFormat.dumps(ast))
+
+    def _version(self):
+        return astFormat.tag()
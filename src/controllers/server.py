@@ -0,0 +1,223 @@
+import os
+import sys
+import json
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .lexer import read_source
+from .pipeline import analyze, _payload, INFERERS
+from .resultCache import ResultCache
+
+# Servidor de chequeo: recibe pedidos JSON-RPC 2.0, uno por linea, por TCP local o por un socket
+# Unix y responde cada uno con una linea. Las conexiones las atiende asyncio y el analisis corre
+# en un pool de procesos que ya tienen cargados el parser y el lexer (se cargan al importar
+# controllers, una vez por proceso), asi un pedido no paga el arranque. Los resultados quedan en un
+# cache del servidor, un programa repetido se responde sin pasar por el pool. Con `workers` cada
+# proceso del pool reparte el chequeo de tipos de su programa entre esa cantidad de procesos.
+#
+#   {"jsonrpc": "2.0", "id": 1, "method": "check", "params": {"code": "class Main { ... };"}}
+#   {"jsonrpc": "2.0", "id": 1, "result": {"errors": "Errors:\n...", "inference": "Inference:\n..."}}
+#
+# Metodos:
+#   check   {"code": str} o {"path": str}, opcional "inferer" (una llave de INFERERS, por defecto
+#           el del servidor) retorna lo mismo que handler
+#   stats   contadores del cache de resultados (hits, misses, ...)
+#   ping    retorna "pong"
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+# las lineas pueden traer programas completos
+LINE_LIMIT = 64 * 1024 * 1024
+
+_WARMUP = 'class Main { main(): Object { let x: AUTO_TYPE <- 1 in x + 1 }; };'
+
+class RPCError(Exception):
+    # los argumentos quedan en args para que la excepcion se pueda pasar desde el pool
+    def __init__(self, code, message):
+        super().__init__(code, message)
+        self.code = code
+        self.message = message
+
+
+# un analisis de un programa chico deja listas las tablas de despacho de los visitors
+def _start_worker():
+    sys.stdout = sys.stderr
+    analyze(_WARMUP)
+
+# (code, inferer) del pedido de check, `inferer` si el pedido no dice cual
+def source(params, inferer='fixpoint'):
+    if not isinstance(params, dict):
+        raise RPCError(INVALID_PARAMS, 'params must be an object')
+
+    inferer = params.get('inferer', inferer)
+    if inferer not in INFERERS:
+        raise RPCError(INVALID_PARAMS, f'unknown inferer "{inferer}"')
+
+    if isinstance(params.get('code'), str):
+        code = params['code']
+    elif isinstance(params.get('path'), str):
+        try:
+            code = read_source(params['path'])
+        except OSError as ex:
+            raise RPCError(INVALID_PARAMS, str(ex))
+    else:
+        raise RPCError(INVALID_PARAMS, 'expected "code" or "path"')
+
+    return code, inferer
+
+METHODS = ('check', 'stats', 'ping')
+
+
+class CheckServer:
+    def __init__(self, jobs=None, cache=None, inferer='fixpoint', workers=None):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.inferer = inferer
+        self.workers = workers
+        self.executor = None
+        self.cache = ResultCache.from_environment(1024) if cache is None else cache
+
+    def __enter__(self):
+        self.executor = self._executor()
+        return self
+
+    def __exit__(self, *exc):
+        self.executor.shutdown(cancel_futures=True)
+        self.executor = None
+
+    async def serve(self, host='127.0.0.1', port=8765, path=None):
+        if path is not None:
+            server = await asyncio.start_unix_server(self._client, path, limit=LINE_LIMIT)
+            address = path
+        else:
+            server = await asyncio.start_server(self._client, host, port, limit=LINE_LIMIT)
+            address = '%s:%d' % server.sockets[0].getsockname()[:2]
+
+        print(f'Listening on {address} with {self.jobs} workers', file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+    # cada pedido de una conexion se atiende por separado, las respuestas salen en el orden en
+    # que terminan (el id dice a que pedido corresponden)
+    async def _client(self, reader, writer):
+        tasks = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self._answer(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def _answer(self, line, writer):
+        try:
+            message = json.loads(line)
+        except ValueError:
+            response = _error(None, PARSE_ERROR, 'parse error')
+        else:
+            if isinstance(message, list) and message:
+                responses = await asyncio.gather(*(self.dispatch(item) for item in message))
+                response = [r for r in responses if r is not None] or None
+            else:
+                response = await self.dispatch(message)
+
+        if response is not None and not writer.is_closing():
+            writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+    # respuesta a un pedido (None si es una notificacion, sin id)
+    async def dispatch(self, message):
+        if not isinstance(message, dict) or message.get('jsonrpc') != '2.0' or not isinstance(message.get('method'), str):
+            return _error(message.get('id') if isinstance(message, dict) else None, INVALID_REQUEST, 'invalid request')
+
+        notification = 'id' not in message
+        try:
+            if message['method'] not in METHODS:
+                raise RPCError(METHOD_NOT_FOUND, f'method "{message["method"]}" not found')
+            result = await getattr(self, message['method'])(message.get('params', {}))
+        except RPCError as ex:
+            response = _error(message.get('id'), ex.code, ex.message)
+        except Exception as ex:
+            response = _error(message.get('id'), INTERNAL_ERROR, f'{type(ex).__name__}: {ex}')
+        else:
+            response = {'jsonrpc': '2.0', 'id': message.get('id'), 'result': result}
+
+        return None if notification else response
+
+    async def check(self, params):
+        loop = asyncio.get_running_loop()
+        # los archivos se leen en un hilo para no frenar las demas conexiones
+        if isinstance(params, dict) and not isinstance(params.get('code'), str):
+            code, inferer = await loop.run_in_executor(None, source, params, self.inferer)
+        else:
+            code, inferer = source(params, self.inferer)
+
+        key = self.cache.key(code, inferer)
+        result = self.cache.get(key)
+        if result is None:
+            result = await self._analyze(code, inferer)
+            self.cache.put(key, *result)
+        return _payload(*result)
+
+    def _executor(self):
+        return ProcessPoolExecutor(self.jobs, initializer=_start_worker)
+
+    # si un proceso del pool muere (un programa que lo tumba, el OOM killer) el pool queda roto y
+    # fallan todos los pedidos que tenia: se arma y calienta un pool nuevo para los que siguen. No
+    # se sabe cual de ellos lo tumbo, asi que cada uno se reintenta en un proceso solo para el y
+    # el que tambien lo tumba responde con un error interno
+    async def _analyze(self, code, inferer):
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            return await loop.run_in_executor(executor, analyze, code, inferer, self.workers)
+        except BrokenProcessPool:
+            # otro pedido del mismo pool puede haberlo cambiado ya
+            if self.executor is executor:
+                print('A worker process died, restarting the pool', file=sys.stderr)
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = self._executor()
+
+        alone = ProcessPoolExecutor(1, initializer=_start_worker)
+        try:
+            return await loop.run_in_executor(alone, analyze, code, inferer, self.workers)
+        except BrokenProcessPool:
+            raise RPCError(INTERNAL_ERROR, 'a worker process died while checking the program')
+        finally:
+            alone.shutdown(wait=False)
+
+    async def stats(self, params):
+        return self.cache.stats()
+
+    async def ping(self, params):
+        return 'pong'
+
+
+def _error(request_id, code, message):
+    return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+
+def run(host='127.0.0.1', port=8765, path=None, jobs=None, inferer='fixpoint', workers=None):
+    with CheckServer(jobs, inferer=inferer, workers=workers) as server:
+        try:
+            asyncio.run(server.serve(host, port, path))
+        except KeyboardInterrupt:
+            pass
+    return 0
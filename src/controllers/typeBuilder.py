@@ -2,7 +2,7 @@ from .cmp import AutoType, SelfType, ErrorType, SemanticError, visitor
 from .parser import ProgramNode, ClassDeclarationNode, AttrDeclarationNode, FuncDeclarationNode
 from .messages import ERROR
 
-class TypeBuilder:
+class TypeBuilder(visitor.Visitor):
     def __init__(self, context, errors=[]):
         self.context = context
         self.current_type = None
@@ -10,14 +10,18 @@ class TypeBuilder:
 
         self.object_type = self.context.get_type('Object')
         self.io_type = self.context.get_type('IO')
-        self.io_type.set_parent(self.object_type)
         self.int_type = self.context.get_type('Int')
+        self.string_type = self.context.get_type('String')
+        self.bool_type = self.context.get_type('Bool')
+
+    # los tipos basicos se completan al visitar el programa, asi el builder tambien sirve
+    # para volver a construir una clase sola en un contexto ya construido
+    def define_builtins(self):
+        self.io_type.set_parent(self.object_type)
         self.int_type.set_parent(self.object_type)
         self.int_type.sealed = True
-        self.string_type = self.context.get_type('String')
         self.string_type.set_parent(self.object_type)
         self.string_type.sealed = True
-        self.bool_type = self.context.get_type('Bool')
         self.bool_type.set_parent(self.object_type)
         self.bool_type.sealed = True
 
@@ -38,9 +42,13 @@ class TypeBuilder:
 
     @visitor.when(ProgramNode)
     def visit(self, node):
+        self.define_builtins()
+
         for def_class in node.declarations:
             self.visit(def_class)
 
+        self.context.build_hierarchy()
+
         try:
             self.context.get_type('Main').get_method('main')
         except SemanticError:
@@ -2,7 +2,7 @@ from .cmp import Scope, SelfType, AutoType, ErrorType, SemanticError, visitor
 from .parser import ProgramNode, ClassDeclarationNode, AttrDeclarationNode, FuncDeclarationNode, IfThenElseNode, WhileLoopNode, BlockNode, LetInNode, CaseOfNode, AssignNode, UnaryNode, BinaryNode, LessEqualNode, LessNode, EqualNode, ArithmeticNode, NotNode, IsVoidNode, ComplementNode, FunctionCallNode, MemberCallNode, NewNode, AtomicNode, IntegerNode, IdNode, StringNode, BoolNode
 from .messages import ERROR, INCOMPATIBLE_TYPES, INVALID_OPERATION, REDEFINED_METHOD, REDEFINED_VARIABLE, SELF_IS_READONLY, VARIABLE_NOT_DEFINED, CYCLIC_HERITAGE
 
-class TypeChecker:
+class TypeChecker(visitor.Visitor):
     def __init__(self, context, errors=[]):
         self.context = context
         self.errors = errors
@@ -23,7 +23,7 @@ class TypeChecker:
     def visit(self, node, scope=None):
         scope = Scope()
         for class_declaration in node.declarations:
-            self.visit(class_declaration, scope.create_child())
+            yield class_declaration, scope.create_child()
         return scope
 
     # class <type> [inherits <type> ] {
@@ -32,7 +32,8 @@ class TypeChecker:
     def visit(self, node, scope):
         self.current_type = self.context.get_type(node.id.lex)
 
-        parent = self.current_type.parent
+        # los tipos numerados en el indice de la jerarquia no pueden estar en un ciclo
+        parent = None if self.current_type.indexed_with(self.object_type) else self.current_type.parent
         while parent:
             if parent == self.current_type:
                 self.errors.append(ERROR % (node.line, node.column) + CYCLIC_HERITAGE % (parent.name))
@@ -44,14 +45,14 @@ class TypeChecker:
             scope.define_variable(attr.name, attr.type)
 
         for f in node.features:
-            self.visit(f, scope.create_child())
+            yield f, scope.create_child()
 
     # id: type [ <- <expression>]
     @visitor.when(AttrDeclarationNode)
     def visit(self, node, scope):
 
         if node.expression:
-            self.visit(node.expression, scope.create_child())
+            yield node.expression, scope.create_child()
 
             expr_type = node.expression.static_type
 
@@ -72,18 +73,15 @@ class TypeChecker:
 
         parent = self.current_type.parent
         if parent:
-            try:
-                parent_method = parent.get_method(node.id.lex)
-            except SemanticError as err:
-                pass
-            else:
+            parent_method = parent.find_method(node.id.lex)
+            if parent_method is not None:
                 if parent_method.param_types != self.current_method.param_types or parent_method.return_type != self.current_method.return_type:
                     self.errors.append(ERROR % (node.line, node.column) + REDEFINED_METHOD % ( self.current_method.name, self.current_type.name, parent.name))
 
         for pname, ptype in zip(self.current_method.param_names, self.current_method.param_types):
             scope.define_variable(pname, ptype)
 
-        self.visit(node.body, scope.create_child())
+        yield node.body, scope.create_child()
 
         body_type = node.body.static_type
         return_type = self.current_type if isinstance(self.current_method.return_type, SelfType) else self.current_method.return_type
@@ -94,14 +92,14 @@ class TypeChecker:
     # if <expr> then <expr> else <expr> fi
     @visitor.when(IfThenElseNode)
     def visit(self, node, scope):
-        self.visit(node.condition, scope.create_child())
+        yield node.condition, scope.create_child()
 
         condition_type = node.condition.static_type
         if not condition_type.conforms_to(self.bool_type):
             self.errors.append(ERROR % (node.condition.line, node.condition.column) + INCOMPATIBLE_TYPES % (condition_type.name, self.bool_type.name))
 
-        self.visit(node.if_body, scope.create_child())
-        self.visit(node.else_body, scope.create_child())
+        yield node.if_body, scope.create_child()
+        yield node.else_body, scope.create_child()
 
         if_type = node.if_body.static_type
         else_type = node.else_body.static_type
@@ -110,13 +108,13 @@ class TypeChecker:
     # while <expr> loop <expr> pool
     @visitor.when(WhileLoopNode)
     def visit(self, node, scope):
-        self.visit(node.condition, scope.create_child())
+        yield node.condition, scope.create_child()
 
         condition_type = node.condition.static_type
         if not condition_type.conforms_to(self.bool_type):
             self.errors.append(INCOMPATIBLE_TYPES % (condition_type.name, self.bool_type.name))
 
-        self.visit(node.body, scope.create_child())
+        yield node.body, scope.create_child()
 
         node.static_type = self.object_type
 
@@ -124,7 +122,7 @@ class TypeChecker:
     @visitor.when(BlockNode)
     def visit(self, node, scope):
         for exp in node.expressions:
-            self.visit(exp, scope.create_child())
+            yield exp, scope.create_child()
 
         node.static_type = node.expressions[-1].static_type
 
@@ -142,7 +140,7 @@ class TypeChecker:
             child_scope = scope.create_child()
 
             if exp:
-                self.visit(exp, child_scope)
+                yield exp, child_scope
                 exp_type = exp.static_type
 
                 if not exp_type.conforms_to(id_type):
@@ -150,7 +148,7 @@ class TypeChecker:
 
             scope.define_variable(idx.lex, id_type)
 
-        self.visit(node.in_body, scope.create_child())
+        yield node.in_body, scope.create_child()
         node.static_type = node.in_body.static_type
 
     # case <expr0> of
@@ -160,7 +158,7 @@ class TypeChecker:
     # esac
     @visitor.when(CaseOfNode)
     def visit(self, node, scope):
-        self.visit(node.expression, scope.create_child())
+        yield node.expression, scope.create_child()
         node.static_type = None
 
         for idx, typex, expr in node.branches:
@@ -178,7 +176,7 @@ class TypeChecker:
 
             child_scope = scope.create_child()
             child_scope.define_variable(idx.lex, id_type)
-            self.visit(expr, child_scope)
+            yield expr, child_scope
             expr_type = expr.static_type
 
             node.static_type = node.static_type.join_type(expr_type) if node.static_type else expr_type
@@ -186,11 +184,11 @@ class TypeChecker:
     # <id> <- <expression>
     @visitor.when(AssignNode)
     def visit(self, node, scope):
-        self.visit(node.expression, scope.create_child())
+        yield node.expression, scope.create_child()
         exp_type = node.expression.static_type
 
-        if scope.is_defined(node.id.lex):
-            var = scope.find_variable(node.id.lex)
+        var = scope.lookup(node.id.lex)
+        if var is not None:
             node_type = var.type
 
             if var.name == 'self':
@@ -204,7 +202,7 @@ class TypeChecker:
 
     @visitor.when(NotNode)
     def visit(self, node, scope):
-        self.visit(node.expression, scope.create_child())
+        yield node.expression, scope.create_child()
         expr_type = node.expression.static_type
 
         if not expr_type.conforms_to(self.bool_type):
@@ -215,13 +213,13 @@ class TypeChecker:
     # <exp1> <= <exp2>
     @visitor.when(LessEqualNode)
     def visit(self, node, scope):
-        self.visit(node.left, scope.create_child())
+        yield node.left, scope.create_child()
         left_type = node.left.static_type
 
         if not left_type.conforms_to(self.int_type):
             self.errors.append(ERROR % (node.left.line, node.left.column) + INVALID_OPERATION % (left_type.name, self.int_type.name))
 
-        self.visit(node.right, scope.create_child())
+        yield node.right, scope.create_child()
         right_type = node.right.static_type
 
         if not right_type.conforms_to(self.int_type):
@@ -232,13 +230,13 @@ class TypeChecker:
     # <exp1> < <exp2>
     @visitor.when(LessNode)
     def visit(self, node, scope):
-        self.visit(node.left, scope.create_child())
+        yield node.left, scope.create_child()
         left_type = node.left.static_type
 
         if not left_type.conforms_to(self.int_type):
             self.errors.append(ERROR % (node.left.line, node.left.column) + INVALID_OPERATION % (left_type.name, self.int_type.name))
 
-        self.visit(node.right, scope.create_child())
+        yield node.right, scope.create_child()
         right_type = node.right.static_type
 
         if not right_type.conforms_to(self.int_type):
@@ -249,10 +247,10 @@ class TypeChecker:
     # <exp1> = <exp2>
     @visitor.when(EqualNode)
     def visit(self, node, scope):
-        self.visit(node.left, scope.create_child())
+        yield node.left, scope.create_child()
         left_type = node.left.static_type
 
-        self.visit(node.right, scope.create_child())
+        yield node.right, scope.create_child()
         right_type = node.right.static_type
 
         # [0 ^ 0 = 0] [1 ^ 1 = 0] [0 ^ 1 = 1] [1 ^ 0 == 1]
@@ -269,10 +267,10 @@ class TypeChecker:
 
     @visitor.when(ArithmeticNode)
     def visit(self, node, scope):
-        self.visit(node.left, scope.create_child())
+        yield node.left, scope.create_child()
         left_type = node.left.static_type
 
-        self.visit(node.right, scope.create_child())
+        yield node.right, scope.create_child()
         right_type = node.right.static_type
 
         if not left_type.conforms_to(self.int_type) or not right_type.conforms_to(self.int_type):
@@ -283,13 +281,13 @@ class TypeChecker:
     # isvoid <exp>
     @visitor.when(IsVoidNode)
     def visit(self, node, scope):
-        self.visit(node.expression, scope.create_child())
+        yield node.expression, scope.create_child()
 
         node.static_type = self.bool_type
 
     @visitor.when(ComplementNode)
     def visit(self, node, scope):
-        self.visit(node.expression, scope.create_child())
+        yield node.expression, scope.create_child()
 
         expr_type = node.expression.static_type
         if not expr_type.conforms_to(self.int_type):
@@ -302,7 +300,7 @@ class TypeChecker:
     # <expr>@<type>.id(<expr>,...,<expr>)
     @visitor.when(FunctionCallNode)
     def visit(self, node, scope):
-        self.visit(node.obj, scope.create_child())
+        yield node.obj, scope.create_child()
         obj_type = node.obj.static_type
 
         try:
@@ -326,7 +324,7 @@ class TypeChecker:
 
             if len(node.args) == len(obj_method.param_types):
                 for arg, param_type in zip(node.args, obj_method.param_types):
-                    self.visit(arg, scope.create_child())
+                    yield arg, scope.create_child()
 
                     arg_type = arg.static_type
 
@@ -352,7 +350,7 @@ class TypeChecker:
 
             if len(node.args) == len(method.param_types):
                 for arg, param_type in zip(node.args, method.param_types):
-                    self.visit(arg, scope.create_child())
+                    yield arg, scope.create_child()
 
                     arg_type = arg.static_type
 
@@ -390,8 +388,9 @@ class TypeChecker:
 
     @visitor.when(IdNode)
     def visit(self, node, scope):
-        if scope.is_defined(node.token.lex):
-            node_type = scope.find_variable(node.token.lex).type
+        var = scope.lookup(node.token.lex)
+        if var is not None:
+            node_type = var.type
         else:
             node_type = ErrorType()
             self.errors.append(ERROR % (node.token.line, node.token.column) + VARIABLE_NOT_DEFINED % (node.token.lex, self.current_method.name))
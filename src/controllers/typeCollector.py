@@ -3,7 +3,7 @@ from .parser import ProgramNode, ClassDeclarationNode
 from .messages import ERROR
 
 
-class TypeCollector(object):
+class TypeCollector(visitor.Visitor):
     def __init__(self, errors = []):
         self.context = Context()
         self.errors = errors
@@ -1,8 +1,24 @@
-from .cmp import visitor, SelfType, AutoType, ErrorType, SemanticError, Scope, VariableInfo, Method, Type
+from .cmp import visitor, SelfType, AutoType, ErrorType, SemanticError, Scope, VariableInfo, Method, Attribute, Type
 from .parser import ProgramNode, ClassDeclarationNode, AttrDeclarationNode, FuncDeclarationNode, IfThenElseNode, WhileLoopNode, BlockNode, LetInNode, CaseOfNode, AssignNode, UnaryNode, BinaryNode, LessEqualNode, LessNode, EqualNode, ArithmeticNode, NotNode, IsVoidNode, ComplementNode, FunctionCallNode, MemberCallNode, NewNode, AtomicNode, IntegerNode, IdNode, StringNode, BoolNode
 from .messages import INFERENCE, INFERENCE_ATTR, INFERENCE_PARAM, INFERENCE_RETURN, INFERENCE_VAR
 
-class TypeInferer:
+# estado observable de lo que una unidad lee: variables, metodos, atributos y tipos estaticos de nodos
+def signature(obj):
+    if isinstance(obj, VariableInfo):
+        return (getattr(obj.type, 'name', None), obj.infered)
+    if isinstance(obj, Method):
+        return (tuple(getattr(t, 'name', None) for t in obj.param_types), getattr(obj.return_type, 'name', None),
+                tuple(signature(info) for info in obj.param_infos), signature(obj.return_info))
+    if isinstance(obj, Attribute):
+        return getattr(obj.type, 'name', None)
+    return getattr(obj.static_type, 'name', None)
+
+# Cada pasada de `visit(ast, scope)` equivale a recorrer todo el AST, pero solo se vuelven a visitar
+# las unidades (atributos, metodos y el cierre de cada clase) que pueden hacer algo distinto:
+# las que en su ultima visita agregaron mensajes o cambiaron algo, y las que leyeron una variable,
+# metodo o atributo que otra unidad cambio despues. Una unidad que se salta no haria nada, asi
+# que los mensajes de inferencia y su orden son los mismos que con el recorrido completo.
+class TypeInferer(visitor.Visitor):
     def __init__(self, contxt, errors = [], inference: list = []):
         self.current_type = None
         self.current_method = None
@@ -10,6 +26,11 @@ class TypeInferer:
         self.errors = errors
         self.inference = inference
 
+        self.units = {}     # unidad -> {id: (objeto, firma)} de su ultima visita
+        self.readers = {}   # id de objeto -> unidades que lo leyeron
+        self.dirty = set()  # unidades que hay que volver a visitar
+        self.reads = None
+
         self.object_type = self.context.get_type('Object')
         self.io_type = self.context.get_type('IO')
         self.string_type = self.context.get_type('String')
@@ -20,26 +41,65 @@ class TypeInferer:
     def visit(self, node, scope):
         pass
 
+    def pending(self, unit):
+        return unit not in self.units or unit in self.dirty
+
+    def read(self, obj):
+        if self.reads is not None and id(obj) not in self.reads:
+            self.reads[id(obj)] = (obj, signature(obj))
+
+    def start_unit(self, unit):
+        self.dirty.discard(unit)
+        self.reads = {}
+        self.messages = len(self.inference)
+
+    def finish_unit(self, unit):
+        changed = [key for key, (obj, sign) in self.reads.items() if signature(obj) != sign]
+
+        for key in self.units.get(unit, ()):
+            self.readers[key].discard(unit)
+        for key in self.reads:
+            self.readers.setdefault(key, set()).add(unit)
+        self.units[unit] = self.reads
+        self.reads = None
+
+        if changed or len(self.inference) != self.messages:
+            self.dirty.add(unit)
+        for key in changed:
+            self.dirty.update(self.readers[key])
+
     @visitor.when(ProgramNode)
     def visit(self, node: ProgramNode, scope: Scope):
         self.check = False
 
         for decl, childScope in zip(node.declarations, scope.children):
-            self.visit(decl, childScope)
+            yield decl, childScope
 
         return self.check
 
     @visitor.when(ClassDeclarationNode)
     def visit(self, node: ClassDeclarationNode, scope: Scope):
 
+        if not self.pending(node) and not any(self.pending(feature) for feature in node.features):
+            return
+
         self.current_type = self.context.get_type(node.id.lex)
 
         # visit attributes and  methods
         for feature, childScope in zip(node.features, scope.children):
-            self.visit(feature, childScope)
+            if self.pending(feature):
+                self.start_unit(feature)
+                yield feature, childScope
+                self.finish_unit(feature)
+
+        if not self.pending(node):
+            return
 
         # recorrer todas las variables locales que estan definidas por typeChecker
+        self.start_unit(node)
         for attr, var in zip(self.current_type.attributes, scope.locals):
+            self.read(attr)
+            self.read(var)
             if not var.infered:
                 if isinstance(var.type, ErrorType) or isinstance(var.type, AutoType):
                     pass
@@ -47,17 +107,20 @@ class TypeInferer:
                     self.check = var.infered = True
                     attr.type = var.type
                     self.inference.append(INFERENCE_ATTR % (self.current_type.name, attr.name, var.type.name))
+        self.finish_unit(node)
 
     @visitor.when(AttrDeclarationNode)
     def visit(self, node: AttrDeclarationNode, scope: Scope):
         if node.expression:
             attr = self.current_type.get_attribute(node.id.lex)
+            self.read(attr)
 
             # visitar la expression, el scope de la expression esta en 0 xq a los atributos solo se le puede asignar un tipo expression y xq tanto estas tienen su scope en 0
-            self.visit(node.expression, scope.children[0], attr.type)
+            yield node.expression, scope.children[0], attr.type
             exp_type = node.expression.static_type
 
-            var = scope.find_variable(node.id.lex)
+            var = scope.lookup(node.id.lex)
+            self.read(var)
             if not var.infered:
                 if isinstance(var.type, ErrorType) or isinstance(var.type, AutoType):
                     pass
@@ -69,15 +132,17 @@ class TypeInferer:
     @visitor.when(FuncDeclarationNode)
     def visit(self, node: FuncDeclarationNode, scope: Scope):
         self.current_method: Method = self.current_type.get_method(node.id.lex)
+        self.read(self.current_method)
         return_type: Type = self.current_method.return_type
 
         #print(len(scope.children), node.id)
-        self.visit(node.body, scope.children[0], self.current_type if isinstance(return_type, SelfType) else return_type)
+        yield node.body, scope.children[0], self.current_type if isinstance(return_type, SelfType) else return_type
 
         body_type = node.body.static_type
 
         # recorrido por los parametros del metodo, se visita de uno en adelante xq locaĺ[0] = self
         for i, var in enumerate(scope.locals[1:]): 
+            self.read(var)
             if not var.infered:
                 if isinstance(var.type, ErrorType) or isinstance(var.type, AutoType):
                     pass
@@ -114,10 +179,10 @@ class TypeInferer:
 
     @visitor.when(IfThenElseNode)
     def visit(self, node: IfThenElseNode, scope: Scope, new_type = None):
-        self.visit(node.condition, scope.children[0], self.bool_type)
+        yield node.condition, scope.children[0], self.bool_type
 
-        self.visit(node.if_body, scope.children[1])
-        self.visit(node.else_body, scope.children[2])
+        yield node.if_body, scope.children[1]
+        yield node.else_body, scope.children[2]
 
         if_type = node.if_body.static_type
         else_type = node.else_body.static_type
@@ -126,24 +191,25 @@ class TypeInferer:
 
     @visitor.when(WhileLoopNode)
     def visit(self, node: WhileLoopNode, scope: Scope, new_type = None):
-        self.visit(node.condition, scope.children[0], self.bool_type)
+        yield node.condition, scope.children[0], self.bool_type
 
-        self.visit(node.body, scope.children[1])
+        yield node.body, scope.children[1]
 
         node.static_type = self.object_type
 
     @visitor.when(BlockNode)
     def visit(self, node: BlockNode, scope: Scope, new_type = None):
         for exp, child_scope in zip(node.expressions[:], scope.children[:]):
-            self.visit(exp, child_scope)
+            yield exp, child_scope
 
         node.static_type = node.expressions[-1].static_type
 
     @visitor.when(LetInNode)
     def visit(self, node: LetInNode, scope: Scope, new_type = None):
         for (idx, typex, exp), child_scope, (i, var) in zip(node.let_body, scope.children[:-1], enumerate(scope.locals)):
+            self.read(var)
             if exp:
-                self.visit(exp, child_scope, var.type if var.infered else None)
+                yield exp, child_scope, var.type if var.infered else None
                 
                 expr_type = exp.static_type
 
@@ -156,9 +222,10 @@ class TypeInferer:
                         node.let_body[i] = (idx.lex, var.type, exp)
                         self.inference.append(INFERENCE % (idx.line, idx.column) + INFERENCE_VAR % (idx.lex, var.type.name))
 
-        self.visit(node.in_body, scope.children[-1], new_type)
+        yield node.in_body, scope.children[-1], new_type
 
         for i, var in enumerate(scope.locals):
+            self.read(var)
             if not var.infered:
                 if isinstance(var.type, ErrorType):
                     pass
@@ -174,21 +241,23 @@ class TypeInferer:
 
     @visitor.when(CaseOfNode)
     def visit(self, node: CaseOfNode, scope: Scope, new_type = None):
-        self.visit(node.expression, scope.children[0])
+        yield node.expression, scope.children[0]
 
         node.static_type = None
 
         for (idx, typex, exp), child_scope in zip(node.branches, scope.children[1:]):
-            self.visit(exp, child_scope)
+            yield exp, child_scope
             exp_type = exp.static_type
 
             node.static_type = node.static_type.join_type(exp_type) if node.static_type else exp_type
 
     @visitor.when(AssignNode)
     def visit(self, node: AssignNode, scope: Scope, new_type = None):
-        var = scope.find_variable(node.id.lex) if scope.is_defined(node.id.lex) else None
+        var = scope.lookup(node.id.lex)
+        if var is not None:
+            self.read(var)
 
-        self.visit(node.expression, scope.children[0], var.type if var and var.infered else None)
+        yield node.expression, scope.children[0], var.type if var and var.infered else None
         expr_type = node.expression.static_type
 
         if var and not var.infered:
@@ -202,50 +271,52 @@ class TypeInferer:
 
     @visitor.when(NotNode)
     def visit(self, node: NotNode, scope: Scope, new_type = None):
-        self.visit(node.expression, scope.children[0], self.bool_type)
+        yield node.expression, scope.children[0], self.bool_type
 
         node.static_type = self.bool_type
 
     @visitor.when(LessEqualNode)
     def visit(self, node: LessEqualNode, scope: Scope, new_type = None):
-        self.visit(node.left, scope.children[0], self.int_type)
+        yield node.left, scope.children[0], self.int_type
 
-        self.visit(node.right, scope.children[1], self.int_type)
+        yield node.right, scope.children[1], self.int_type
 
         node.static_type = self.bool_type
 
     @visitor.when(LessNode)
     def visit(self, node: LessNode, scope: Scope, new_type = None):
-        self.visit(node.left, scope.children[0], self.int_type)
+        yield node.left, scope.children[0], self.int_type
 
-        self.visit(node.right, scope.children[1], self.int_type)
+        yield node.right, scope.children[1], self.int_type
 
         node.static_type = self.bool_type
 
     @visitor.when(EqualNode)
     def visit(self, node: EqualNode, scope: Scope, new_type = None):
-        self.visit(node.left, scope.children[0], node.left.static_type)
+        self.read(node.left)
+        self.read(node.right)
+        yield node.left, scope.children[0], node.left.static_type
 
-        self.visit(node.right, scope.children[1], node.right.static_type)
+        yield node.right, scope.children[1], node.right.static_type
 
         node.static_type = self.bool_type
 
     @visitor.when(ArithmeticNode)
     def visit(self, node: ArithmeticNode, scope: Scope, new_type = None):
-        self.visit(node.left, scope.children[0], self.int_type)
-        self.visit(node.right, scope.children[1], self.int_type)
+        yield node.left, scope.children[0], self.int_type
+        yield node.right, scope.children[1], self.int_type
 
         node.static_type = self.int_type
 
     @visitor.when(IsVoidNode)
     def visit(self, node: IsVoidNode, scope: Scope, new_type = None):
-        self.visit(node.expression, scope.children[0])
+        yield node.expression, scope.children[0]
 
         node.static_type = self.bool_type
 
     @visitor.when(ComplementNode)
     def visit(self, node: ComplementNode, scope: Scope, new_type = None):
-        self.visit(node.expression, scope.children[0], self.int_type)
+        yield node.expression, scope.children[0], self.int_type
 
         node.static_type = self.int_type
 
@@ -262,26 +333,24 @@ class TypeInferer:
                 if isinstance(node_type, SelfType) or isinstance(node_type, AutoType):
                     node_type = ErrorType()
 
-        self.visit(node.obj, scope.children[0], node_type)
+        yield node.obj, scope.children[0], node_type
         obj_type = node.obj.static_type
 
-        try:
-            obj_type = node_type if node_type else obj_type
-
-            obj_method = obj_type.get_method(node.id.lex)
+        obj_type = node_type if node_type else obj_type
+        obj_method = obj_type.find_method(node.id.lex)
 
-            node_type = obj_type if isinstance(obj_method.return_type, SelfType) else obj_method.return_type
-
-        except SemanticError:
+        if obj_method is None:
             node_type = ErrorType()
-            obj_method = None
+        else:
+            self.read(obj_method)
+            node_type = obj_type if isinstance(obj_method.return_type, SelfType) else obj_method.return_type
 
         if obj_method and len(node.args) == len(obj_method.param_types):
             for arg, var, child_scope in zip(node.args, obj_method.param_infos, scope.children[1:]):
-                self.visit(arg, child_scope, var.type if var.infered else None)
+                yield arg, child_scope, var.type if var.infered else None
         else:
             for arg, child_scope in zip(node.args, scope.children[1:]):
-                self.visit(arg, child_scope)
+                yield arg, child_scope
 
         node.static_type = node_type
 
@@ -289,20 +358,20 @@ class TypeInferer:
     def visit(self, node: MemberCallNode, scope: Scope, new_type = None):
         obj_type = self.current_type
 
-        try:
-            obj_method = obj_type.get_method(node.id.lex)
+        obj_method = obj_type.find_method(node.id.lex)
 
-            node_type = obj_type if isinstance(obj_method.return_type, SelfType) else obj_method.return_type
-        except SemanticError:
+        if obj_method is None:
             node_type = ErrorType()
-            obj_method = None
+        else:
+            self.read(obj_method)
+            node_type = obj_type if isinstance(obj_method.return_type, SelfType) else obj_method.return_type
 
         if obj_method and len(node.args) == len(obj_method.param_types):
             for arg, var, child_scope in zip(node.args, obj_method.param_infos, scope.children):
-                self.visit(arg, child_scope, var.type if var.infered else None)
+                yield arg, child_scope, var.type if var.infered else None
         else:
             for arg, child_scope in zip(node.args, scope.children):
-                self.visit(arg, child_scope)
+                yield arg, child_scope
 
         node.static_type = node_type
 
@@ -325,8 +394,9 @@ class TypeInferer:
 
     @visitor.when(IdNode)
     def visit(self, node: IdNode, scope: Scope, new_type = None):
-        if scope.is_defined(node.token.lex):
-            var = scope.find_variable(node.token.lex)
+        var = scope.lookup(node.token.lex)
+        if var is not None:
+            self.read(var)
 
             if new_type and not var.infered:
                 if isinstance(new_type, ErrorType) or isinstance(new_type, SelfType):
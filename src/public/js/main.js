@@ -1,27 +1,56 @@
+// identifica esta pagina en el servidor, los pedidos de otra pagina no cancelan los de esta
+const client = Math.random().toString(36).slice(2);
+
+// espera despues de la ultima tecla antes de mandar el programa
+const DEBOUNCE = 300;
+
 const vue = new Vue({
     el: "#app",
     data: {
         errors: [],
         inference: [],
-        code: ""
+        code: "",
+        generation: 0,
+        timer: null
     },
     mounted() {
+        document.querySelector("#code").addEventListener("input", () => {
+            clearTimeout(this.timer);
+            this.timer = setTimeout(this.run, DEBOUNCE);
+        });
     },
     methods: {
         run: function () {
+            clearTimeout(this.timer);
             this.code = document.querySelector("#code").value;
             // console.log(this.code.length)
-            
-            eel.handler(this.code)().then(data => {
+
+            // el resultado llega por fases en phase
+            eel.submit(client, this.code)().then(generation => {
+                this.generation = Math.max(this.generation, generation);
+            })
+
+        },
+        phase: function (generation, name, data) {
+            // las fases de un pedido viejo se ignoran
+            if (generation < this.generation)
+                return;
+            this.generation = generation;
+
+            if (name == "tokens") {
+                this.errors = `Errors: ...`;
+                this.inference = `Inference: ... (${data.tokens} tokens)`;
+            } else {
                 this.errors = data.errors;
 
                 if (data.inference)
                     this.inference = data.inference;
+                else if (name == "check")
+                    this.inference = `Inference: ...`;
                 else this.inference = `Inference: -`
+            }
 
-                document.querySelector("#result").value = `${data.errors}\n\n${data.inference}`;
-            })
-
+            document.querySelector("#result").value = `${this.errors}\n\n${this.inference}`;
         },
         selectCode: function () {
             this.code = "";
@@ -37,4 +66,11 @@ const vue = new Vue({
             }).bind(this);
         },
     },
-});
\ No newline at end of file
+});
+
+// el servidor manda cada fase del analisis a medida que termina
+eel.expose(phase);
+function phase(client_, generation, name, data) {
+    if (client_ == client)
+        vue.phase(generation, name, data);
+}